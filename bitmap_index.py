@@ -0,0 +1,113 @@
+"""Per-value bitmap indexes for faceted filtering.
+
+Every distinct value of an indexed column gets a bitset over the rows of the
+dataset. Frequent values are stored as packed bitmaps (one bit per row) and
+rare values as sorted row-id arrays, whichever is smaller, like the two
+container kinds of a Roaring bitmap. Filters are combined with bitwise AND/OR
+on packed bitsets and facet counts are popcounts of (filter & value bitmap).
+"""
+import numpy as np
+import pandas as pd
+
+INDEXED_COLUMNS = ('year', 'country', 'city', 'cluster')
+
+
+class BitmapIndex:
+
+    def __init__(self, df, columns=INDEXED_COLUMNS):
+        self.n_rows = len(df)
+        self.n_bytes = (self.n_rows + 7) // 8
+        self.columns = {column: _ColumnIndex(df[column].to_numpy(), self.n_rows) for column in columns}
+
+    def all(self):
+        """Bitset with every row set."""
+        return np.packbits(np.ones(self.n_rows, dtype=bool))
+
+    def none(self):
+        return np.zeros(self.n_bytes, dtype=np.uint8)
+
+    def from_mask(self, mask):
+        """Pack a boolean row mask (e.g. a keyword match) into a bitset."""
+        return np.packbits(np.asarray(mask, dtype=bool))
+
+    def mask(self, column, values):
+        """Bitset of rows whose column equals any of values (OR of the value bitmaps)."""
+        index = self.columns[column]
+        bits = self.none()
+        for value in values:
+            index.or_into(bits, value)
+        return bits
+
+    @staticmethod
+    def intersect(*bitsets):
+        return np.bitwise_and.reduce(bitsets)
+
+    @staticmethod
+    def union(*bitsets):
+        return np.bitwise_or.reduce(bitsets)
+
+    @staticmethod
+    def count(bits):
+        return int(np.bitwise_count(bits).sum())
+
+    def rows(self, bits):
+        """Positional row numbers set in the bitset, in ascending order."""
+        return np.flatnonzero(np.unpackbits(bits, count=self.n_rows))
+
+    def facet_counts(self, column, bits):
+        """Rows under the filter bits for every value of column, largest first (zeros dropped)."""
+        counts = self.columns[column].counts(bits)
+        return counts[counts > 0].sort_values(ascending=False, kind='stable')
+
+
+class _ColumnIndex:
+    """Bitsets for every value of one column."""
+
+    def __init__(self, values, n_rows):
+        codes, uniques = pd.factorize(values)
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        cardinality = np.diff(bounds)
+
+        # A row-id array costs 4 bytes per row, a bitmap n_rows / 8 bytes in total
+        dense = cardinality * 32 >= n_rows
+        self.values = pd.Index(uniques)
+        self.dense_values = np.flatnonzero(dense)
+        self.sparse_values = np.flatnonzero(~dense)
+
+        self.bitmaps = np.zeros((len(self.dense_values), (n_rows + 7) // 8), dtype=np.uint8)
+        for i, code in enumerate(self.dense_values):
+            row_mask = np.zeros(n_rows, dtype=bool)
+            row_mask[order[bounds[code]:bounds[code + 1]]] = True
+            self.bitmaps[i] = np.packbits(row_mask)
+        self.dense_slot = {code: i for i, code in enumerate(self.dense_values)}
+
+        # Sparse values share one concatenated, per-value sorted row-id array
+        sparse_rows = [np.sort(order[bounds[code]:bounds[code + 1]]) for code in self.sparse_values]
+        self.sparse_rows = np.concatenate(sparse_rows).astype(np.uint32) if sparse_rows else np.empty(0, np.uint32)
+        self.sparse_owner = np.repeat(np.arange(len(self.sparse_values)), cardinality[self.sparse_values])
+        self.sparse_bounds = np.concatenate([[0], np.cumsum(cardinality[self.sparse_values])])
+        self.sparse_slot = {code: i for i, code in enumerate(self.sparse_values)}
+
+    def or_into(self, bits, value):
+        if value not in self.values:
+            return
+        code = self.values.get_loc(value)
+        if code in self.dense_slot:
+            np.bitwise_or(bits, self.bitmaps[self.dense_slot[code]], out=bits)
+        else:
+            slot = self.sparse_slot[code]
+            rows = self.sparse_rows[self.sparse_bounds[slot]:self.sparse_bounds[slot + 1]]
+            np.bitwise_or.at(bits, rows >> 3, (0x80 >> (rows & 7)).astype(np.uint8))
+
+    def counts(self, bits):
+        counts = np.zeros(len(self.values), dtype=np.int64)
+        if len(self.dense_values):
+            counts[self.dense_values] = np.bitwise_count(self.bitmaps & bits).sum(axis=1)
+        if len(self.sparse_rows):
+            # Test the filter bit of every sparse row id, then total them per value
+            hit = (bits[self.sparse_rows >> 3] >> (7 - (self.sparse_rows & 7))) & 1
+            counts[self.sparse_values] = np.bincount(
+                self.sparse_owner, weights=hit, minlength=len(self.sparse_values)
+            ).astype(np.int64)
+        return pd.Series(counts, index=self.values)
@@ -0,0 +1,164 @@
+"""Offline per-cluster profiles: TF-IDF centroid, top terms, year and country mix.
+
+Build the artifact from the yearly CSVs:        python cluster_profiles.py build
+Fold newly labeled rows into an existing one:   python cluster_profiles.py update new_rows.csv
+"""
+import argparse
+import os
+from collections import Counter
+
+import joblib
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+import data_loader
+
+VECTORIZER_PATH = 'tfidf_vectorizer.joblib'
+PROFILES_PATH = 'cluster_profiles.joblib'
+
+
+class ClusterProfiles:
+    """Additive per-cluster statistics.
+
+    Only sums and counts are stored, so new labeled rows can be folded in with
+    update() without revisiting the rows that were already counted.
+    """
+
+    def __init__(self, terms):
+        self.terms = np.asarray(terms, dtype=object)
+        self.clusters = np.empty(0, dtype=np.int64)
+        self.n_docs = np.empty(0, dtype=np.int64)
+        self.term_sums = sparse.csr_matrix((0, len(self.terms)), dtype=np.float32)
+        self.years = {}
+        self.countries = {}
+
+    def update(self, df, vectorizer):
+        """Add the rows of df (title, cluster, year, country) to the profiles."""
+        df = df.dropna(subset=['title', 'cluster'])
+        if df.empty:
+            return self
+
+        X = vectorizer.transform(df['title']).astype(np.float32)
+        labels = df['cluster'].astype(np.int64).to_numpy()
+
+        # Grow the cluster axis for clusters seen for the first time
+        new_clusters = np.setdiff1d(labels, self.clusters)
+        if len(new_clusters):
+            self.clusters = np.concatenate([self.clusters, new_clusters])
+            order = np.argsort(self.clusters, kind='stable')
+            self.clusters = self.clusters[order]
+            self.n_docs = np.concatenate([self.n_docs, np.zeros(len(new_clusters), dtype=np.int64)])[order]
+            padding = sparse.csr_matrix((len(new_clusters), len(self.terms)), dtype=np.float32)
+            self.term_sums = sparse.vstack([self.term_sums, padding]).tocsr()[order]
+
+        # Cluster x row indicator; indicator @ X sums the TF-IDF rows of every cluster at once
+        rows = np.searchsorted(self.clusters, labels)
+        indicator = sparse.csr_matrix(
+            (np.ones(len(labels), dtype=np.float32), (rows, np.arange(len(labels)))),
+            shape=(len(self.clusters), len(labels)),
+        )
+        self.term_sums = (self.term_sums + indicator @ X).tocsr()
+        self.n_docs += np.bincount(rows, minlength=len(self.clusters))
+
+        for cluster, group in df.groupby('cluster'):
+            self.years.setdefault(int(cluster), Counter()).update(group['year'].astype(int).tolist())
+            self.countries.setdefault(int(cluster), Counter()).update(group['country'].tolist())
+        return self
+
+    def _row(self, cluster):
+        matches = np.flatnonzero(self.clusters == cluster)
+        if not len(matches):
+            raise KeyError(f"Unknown cluster {cluster}")
+        return matches[0]
+
+    def size(self, cluster):
+        return int(self.n_docs[self._row(cluster)])
+
+    def centroid(self, cluster):
+        """Mean TF-IDF vector of the cluster as a dense array."""
+        i = self._row(cluster)
+        return self.term_sums[i].toarray().ravel() / max(self.n_docs[i], 1)
+
+    def top_terms(self, cluster, n=15, distinctive=False):
+        """Highest-weighted centroid terms.
+
+        With distinctive=True terms are ranked by how far the cluster centroid
+        exceeds the corpus-wide mean, which hides terms common to every cluster.
+        """
+        centroid = self.centroid(cluster)
+        if distinctive:
+            overall = np.asarray(self.term_sums.sum(axis=0)).ravel() / max(self.n_docs.sum(), 1)
+            centroid = centroid - overall
+        order = np.argsort(-centroid, kind='stable')[:n]
+        order = order[centroid[order] > 0]
+        return pd.DataFrame({'Term': self.terms[order], 'Weight': centroid[order]})
+
+    def year_histogram(self, cluster):
+        counts = self.years.get(int(cluster), Counter())
+        return pd.DataFrame(sorted(counts.items()), columns=['Year', 'Papers'])
+
+    def country_mix(self, cluster, n=10):
+        counts = self.countries.get(int(cluster), Counter())
+        return pd.DataFrame(counts.most_common(n), columns=['Country', 'Papers'])
+
+    def save(self, path=PROFILES_PATH):
+        # Persist plain state rather than the instance so loading does not depend on how this module was run
+        joblib.dump(vars(self), path, compress=3)
+
+
+def build_profiles(df, vectorizer):
+    return ClusterProfiles(vectorizer.get_feature_names_out()).update(df, vectorizer)
+
+
+def profiles_version(path=PROFILES_PATH):
+    """Size and mtime of the persisted profiles (None if absent), for keying cached copies."""
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def load_profiles(path=PROFILES_PATH):
+    """Load the persisted profiles, or None if they have not been built yet."""
+    if not os.path.exists(path):
+        return None
+    state = joblib.load(path)
+    profiles = ClusterProfiles(state['terms'])
+    vars(profiles).update(state)
+    return profiles
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('command', choices=['build', 'update'])
+    parser.add_argument('csv', nargs='*', help="Newly labeled CSV files (update only)")
+    parser.add_argument('--data-path', default='.')
+    parser.add_argument('--vectorizer', default=VECTORIZER_PATH)
+    parser.add_argument('--output', default=PROFILES_PATH)
+    args = parser.parse_args()
+
+    vectorizer = joblib.load(args.vectorizer)
+
+    if args.command == 'build':
+        df = data_loader.load_combined_dataset(args.data_path)
+        df['year'] = df['publication_date'].dt.year
+        profiles = build_profiles(df, vectorizer)
+    else:
+        profiles = load_profiles(args.output)
+        if profiles is None:
+            parser.error(f"{args.output} does not exist, run 'build' first")
+        for path in args.csv:
+            new_rows = pd.read_csv(path)
+            new_rows['year'] = pd.to_datetime(new_rows['publication_date'], errors='coerce').dt.year
+            new_rows['country'] = new_rows['country'].fillna('Unknown')
+            profiles.update(new_rows.dropna(subset=['year']), vectorizer)
+
+    profiles.save(args.output)
+    for cluster, n_docs in zip(profiles.clusters, profiles.n_docs):
+        terms = ', '.join(profiles.top_terms(cluster, 5)['Term'])
+        print(f"Cluster {cluster}: {n_docs} papers - {terms}")
+
+
+if __name__ == '__main__':
+    main()
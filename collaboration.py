@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+
+# Placeholder written by load_combined_dataset for missing values; never a real collaborator
+UNKNOWN_LABEL = 'Unknown'
+# Front matter shares a generic title across unrelated volumes; it is not a co-authored paper
+GENERIC_TITLES = frozenset(['preface', 'foreword', 'introduction', 'editorial'])
+
+
+class CollaborationGraph:
+    """Undirected, weighted collaboration graph stored as a sparse adjacency matrix.
+
+    Edge weights are the number of papers two nodes share. Degree, weighted
+    degree and connected components are computed once when the graph is built.
+    """
+
+    def __init__(self, labels, adjacency):
+        self.labels = np.asarray(labels, dtype=object)
+        self.index = pd.Index(self.labels)
+        self.adjacency = adjacency.tocsr()
+
+        self.degree = np.diff(self.adjacency.indptr)
+        self.weighted_degree = np.asarray(self.adjacency.sum(axis=1)).ravel().astype(np.int64)
+        self.n_components, self.component = connected_components(self.adjacency, directed=False)
+        self.component_size = np.bincount(self.component, minlength=self.n_components)
+
+    def __len__(self):
+        return len(self.labels)
+
+    @property
+    def n_edges(self):
+        return self.adjacency.nnz // 2
+
+    def top_nodes(self, n=10):
+        """Most collaborative nodes, ranked by shared papers then by distinct collaborators."""
+        order = np.lexsort((-self.degree, -self.weighted_degree))
+        order = order[self.degree[order] > 0][:n]
+        return pd.DataFrame({
+            'Name': self.labels[order],
+            'Collaborators': self.degree[order],
+            'Collaborations': self.weighted_degree[order],
+            'Network Size': self.component_size[self.component[order]],
+        })
+
+    def top_collaborators(self, name, n=10):
+        """Strongest collaborators of a single node."""
+        if name not in self.index:
+            return pd.DataFrame(columns=['Collaborator', 'Shared Papers'])
+        i = self.index.get_loc(name)
+        start, end = self.adjacency.indptr[i], self.adjacency.indptr[i + 1]
+        neighbours = self.adjacency.indices[start:end]
+        weights = self.adjacency.data[start:end]
+        order = np.argsort(-weights, kind='stable')[:n]
+        return pd.DataFrame({
+            'Collaborator': self.labels[neighbours[order]],
+            'Shared Papers': weights[order].astype(np.int64),
+        })
+
+    def subgraph_edges(self, names):
+        """Edges (source, target, weight) among the given nodes, each edge listed once."""
+        positions = self.index.get_indexer(names)
+        positions = positions[positions >= 0]
+        sub = sparse.triu(self.adjacency[positions][:, positions], k=1).tocoo()
+        return pd.DataFrame({
+            'source': self.labels[positions[sub.row]],
+            'target': self.labels[positions[sub.col]],
+            'weight': sub.data.astype(np.int64),
+        })
+
+
+def build_collaboration_graph(df, column='author_name', paper_column='title', date_column='publication_date'):
+    """Build the graph of `column` values that appear together on the same paper.
+
+    A paper is identified by its casefolded title and publication date, and
+    names that differ only in case are one node, labelled by the first spelling
+    seen. Generic front-matter titles (GENERIC_TITLES) are ignored.
+    """
+    pairs = df.loc[df[column] != UNKNOWN_LABEL, [paper_column, date_column, column]].dropna()
+    titles = pairs[paper_column].str.strip().str.casefold()
+    pairs = pairs.assign(title_key=titles, node_key=pairs[column].str.casefold())[~titles.isin(GENERIC_TITLES)]
+    pairs = pairs.drop_duplicates(['title_key', date_column, 'node_key'])
+
+    paper_codes = pairs.groupby(['title_key', date_column], sort=False).ngroup().to_numpy()
+    node_codes, node_keys = pd.factorize(pairs['node_key'])
+    _, first_seen = np.unique(node_codes, return_index=True)
+    labels = pairs[column].to_numpy()[first_seen]
+
+    # Paper x node incidence; B^T B counts the papers each pair of nodes shares
+    incidence = sparse.csr_matrix(
+        (np.ones(len(pairs), dtype=np.int32), (paper_codes, node_codes)),
+        shape=(paper_codes.max() + 1 if len(pairs) else 0, len(node_keys)),
+    )
+    adjacency = (incidence.T @ incidence).tocsr()
+    adjacency.setdiag(0)
+    adjacency.eliminate_zeros()
+    return CollaborationGraph(labels, adjacency)
+
+
+def build_yearly_graphs(df, column='author_name', paper_column='title', date_column='publication_date'):
+    """Build one collaboration graph per publication year."""
+    return {
+        int(year): build_collaboration_graph(year_df, column, paper_column, date_column)
+        for year, year_df in df.groupby('year')
+    }
@@ -0,0 +1,323 @@
+"""Compact inference variant of the TF-IDF cluster model.
+
+Exports the pickled pipeline into a directory of plain .npy arrays (sorted
+feature keys, float32 idf and weights) that load memory-mapped, plus an
+optional hashing featurizer that does not need the vocabulary at all.
+Pruning drops the weights of weak terms but keeps their keys and idf, so every
+title is still normalised over its full vocabulary, exactly as in the pipeline.
+
+Export:        python compact_model.py export [--hashing] [--prune 0.01]
+Parity check:  python compact_model.py report
+
+data_loader.load_model serves the export only after its parity report has
+passed for the current pipeline file; a fresh export starts unapproved.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer, HashingVectorizer
+from sklearn.utils import murmurhash3_32
+
+import data_loader
+from data_loader import COMPACT_MODEL_PATH
+PARITY_FILE = 'parity.json'
+MIN_AGREEMENT = 0.99
+ANALYZER_PARAMS = ['lowercase', 'token_pattern', 'stop_words', 'ngram_range', 'strip_accents', 'analyzer']
+
+
+class CompactClusterModel:
+    """Drop-in replacement for the pipeline's predict(titles).
+
+    Scores are X @ weights + bias, where X is the l2-normalised TF-IDF of each
+    title over all features; pruned features count towards the norm but have no
+    weight row. The label with the highest score wins.
+    """
+
+    def __init__(self, path=COMPACT_MODEL_PATH, mmap_mode='r'):
+        with open(os.path.join(path, 'config.json')) as f:
+            self.config = json.load(f)
+
+        def load(name):
+            return np.load(os.path.join(path, name + '.npy'), mmap_mode=mmap_mode)
+
+        self.keys = load('keys')
+        self.idf = load('idf')
+        self.weights = load('weights')
+        self.bias = load('bias')
+        self.labels = load('labels')
+        # Weight row of each feature, -1 for pruned ones (older exports stored weights for every key)
+        if os.path.exists(os.path.join(path, 'weight_index.npy')):
+            self.weight_index = load('weight_index')
+        else:
+            self.weight_index = np.arange(len(self.keys))
+
+        analyzer_params = dict(self.config['analyzer'])
+        analyzer_params['ngram_range'] = tuple(analyzer_params['ngram_range'])
+        if self.config['featurizer'] == 'hashing':
+            self._hasher = HashingVectorizer(
+                n_features=self.config['n_features'], alternate_sign=False, norm=None, **analyzer_params
+            )
+        else:
+            self._analyze = CountVectorizer(**analyzer_params).build_analyzer()
+
+    def _term_counts(self, titles):
+        """(title index, feature position, count) triplets for the known features."""
+        if self.config['featurizer'] == 'hashing':
+            X = self._hasher.transform(titles)
+            doc_ids = np.repeat(np.arange(len(titles)), np.diff(X.indptr))
+            columns, counts = X.indices, X.data
+        else:
+            doc_ids, columns = [], []
+            for i, title in enumerate(titles):
+                terms = self._analyze(title)
+                columns.extend(terms)
+                doc_ids.extend([i] * len(terms))
+            doc_ids = np.asarray(doc_ids, dtype=np.int64)
+            # Natural width: casting to the keys' dtype would truncate long tokens into false matches
+            columns = np.asarray(columns, dtype=str)
+            counts = None
+
+        # Feature lookup by binary search over the sorted keys instead of a vocabulary dict
+        positions = np.searchsorted(self.keys, columns)
+        positions[positions == len(self.keys)] = 0
+        known = self.keys[positions] == columns
+        doc_ids, positions = doc_ids[known], positions[known]
+
+        if counts is not None:
+            return doc_ids, positions, counts[known].astype(np.float32)
+        pairs, counts = np.unique(doc_ids * len(self.keys) + positions, return_counts=True)
+        return pairs // len(self.keys), pairs % len(self.keys), counts.astype(np.float32)
+
+    def predict(self, titles):
+        if isinstance(titles, str):
+            raise TypeError("predict expects a list of titles, not a single string")
+        titles = list(titles)
+        doc_ids, positions, tf = self._term_counts(titles)
+
+        if self.config['sublinear_tf']:
+            tf = 1 + np.log(tf)
+        if self.config['binary']:
+            tf = np.ones_like(tf)
+        values = tf * self.idf[positions]
+        if self.config['norm'] == 'l2':
+            norms = np.sqrt(np.bincount(doc_ids, weights=values * values, minlength=len(titles)))
+            values = values / norms[doc_ids]
+
+        rows = np.asarray(self.weight_index)[positions]
+        weighted = rows >= 0
+        scores = np.tile(np.asarray(self.bias, dtype=np.float32), (len(titles), 1))
+        np.add.at(scores, doc_ids[weighted], values[weighted, None] * self.weights[rows[weighted]])
+        return np.asarray(self.labels)[scores.argmax(axis=1)]
+
+
+def _linear_form(estimator):
+    """Express the estimator's decision rule as argmax(X @ weights + bias)."""
+    if hasattr(estimator, 'cluster_centers_'):
+        # argmin ||x - c||^2 == argmax (x . c - ||c||^2 / 2)
+        centers = np.asarray(estimator.cluster_centers_, dtype=np.float64)
+        return centers.T, -0.5 * (centers ** 2).sum(axis=1), np.arange(len(centers))
+    if hasattr(estimator, 'coef_') and hasattr(estimator, 'intercept_'):
+        coef = np.atleast_2d(estimator.coef_)
+        intercept = np.atleast_1d(estimator.intercept_)
+        if coef.shape[0] == 1:
+            # Binary classifiers score only the positive class
+            coef = np.vstack([np.zeros_like(coef), coef])
+            intercept = np.concatenate([[0], intercept])
+        return coef.T, intercept, np.asarray(estimator.classes_)
+    raise ValueError(f"Unsupported estimator {type(estimator).__name__}: "
+                     "expected cluster_centers_ or coef_/intercept_")
+
+
+def export(model, output_dir=COMPACT_MODEL_PATH, prune=0.0, hashing=False, n_features=2 ** 18):
+    """Write the compact artifact for a TF-IDF pipeline and return its config.
+
+    Terms whose largest absolute weight is below `prune` times the overall
+    largest weight lose their weight row; prune=0 keeps every weighted term.
+    Pruned terms keep their key and idf so they still count in the l2 norm.
+    """
+    if len(model.steps) != 2:
+        raise ValueError(f"Expected a two-step TfidfVectorizer + estimator pipeline, got steps "
+                         f"{[name for name, _ in model.steps]}")
+    vectorizer, estimator = model.steps[0][1], model.steps[-1][1]
+    if not hasattr(vectorizer, 'vocabulary_') or not hasattr(vectorizer, 'idf_'):
+        raise ValueError("The first pipeline step must be a fitted TfidfVectorizer")
+    if vectorizer.analyzer != 'word' or vectorizer.preprocessor is not None or vectorizer.tokenizer is not None:
+        raise ValueError("Only word analyzers without custom preprocessor/tokenizer callables can be exported")
+
+    weights, bias, labels = _linear_form(estimator)
+    terms = vectorizer.get_feature_names_out()
+    idf = vectorizer.idf_ if vectorizer.use_idf else np.ones(len(terms))
+
+    strength = np.abs(weights).max(axis=1)
+    keep = strength > prune * strength.max()
+
+    analyzer = {name: getattr(vectorizer, name) for name in ANALYZER_PARAMS}
+    if isinstance(analyzer['stop_words'], (set, frozenset)):
+        analyzer['stop_words'] = sorted(analyzer['stop_words'])
+
+    if hashing:
+        # Hash each term to its HashingVectorizer column; colliding terms share a column
+        buckets = np.array([abs(murmurhash3_32(str(t), seed=0)) % n_features for t in terms], dtype=np.int64)
+        keys, inverse = np.unique(buckets, return_inverse=True)
+        idf = np.bincount(inverse, weights=idf) / np.bincount(inverse)
+        # Bucket weights average the kept terms only; buckets without any lose their weight row
+        kept_counts = np.bincount(inverse[keep], minlength=len(keys)).astype(np.float64)
+        bucket_weights = np.stack(
+            [np.bincount(inverse[keep], weights=w, minlength=len(keys)) for w in weights[keep].T], axis=1
+        )
+        weighted = kept_counts > 0
+        weights = bucket_weights[weighted] / kept_counts[weighted, None]
+    else:
+        order = np.argsort(terms)
+        keys, idf = np.asarray(terms[order], dtype=str), idf[order]
+        weighted = keep[order]
+        weights = weights[order][weighted]
+    weight_index = np.full(len(keys), -1, dtype=np.int32)
+    weight_index[weighted] = np.arange(int(weighted.sum()), dtype=np.int32)
+
+    os.makedirs(output_dir, exist_ok=True)
+    # A new export has to pass its own parity report before it is served
+    if os.path.exists(os.path.join(output_dir, PARITY_FILE)):
+        os.remove(os.path.join(output_dir, PARITY_FILE))
+    np.save(os.path.join(output_dir, 'keys.npy'), keys)
+    np.save(os.path.join(output_dir, 'idf.npy'), idf.astype(np.float32))
+    np.save(os.path.join(output_dir, 'weights.npy'), np.ascontiguousarray(weights, dtype=np.float32))
+    np.save(os.path.join(output_dir, 'bias.npy'), bias.astype(np.float32))
+    np.save(os.path.join(output_dir, 'labels.npy'), labels)
+    np.save(os.path.join(output_dir, 'weight_index.npy'), weight_index)
+
+    config = {
+        'featurizer': 'hashing' if hashing else 'vocabulary',
+        'n_features': n_features,
+        'n_terms': int(keep.sum()),
+        'n_terms_original': int(len(keep)),
+        'analyzer': analyzer,
+        'sublinear_tf': bool(vectorizer.sublinear_tf),
+        'binary': bool(vectorizer.binary),
+        'norm': vectorizer.norm,
+    }
+    with open(os.path.join(output_dir, 'config.json'), 'w') as f:
+        json.dump(config, f, indent=2)
+    return config
+
+
+def _measure_load(kind, path, queue):
+    import psutil
+    process = psutil.Process()
+    rss_before = process.memory_info().rss
+    start = time.perf_counter()
+    if kind == 'compact':
+        model = CompactClusterModel(path)
+    else:
+        import joblib
+        model = joblib.load(path)
+    elapsed = time.perf_counter() - start
+    # Touch the model once so lazily mapped pages are counted
+    model.predict(["warm up"])
+    queue.put((elapsed, process.memory_info().rss - rss_before))
+
+
+def measure_load(kind, path):
+    """Load time (s) and RSS growth (bytes) of a model, measured in a fresh process."""
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    process = ctx.Process(target=_measure_load, args=(kind, path, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def predict_latency(model, titles):
+    """Per-title predict latency in milliseconds (p50, p95)."""
+    timings = []
+    for title in titles:
+        start = time.perf_counter()
+        model.predict([title])
+        timings.append((time.perf_counter() - start) * 1000)
+    return np.percentile(timings, 50), np.percentile(timings, 95)
+
+
+def _model_stamp(model_path):
+    stat = os.stat(model_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def parity_passed(compact_path=COMPACT_MODEL_PATH, model_path=data_loader.MODEL_PATH):
+    """Whether the export's last parity report passed against the current pipeline file."""
+    try:
+        with open(os.path.join(compact_path, PARITY_FILE)) as f:
+            parity = json.load(f)
+        return parity['passed'] and parity['model'] == _model_stamp(model_path)
+    except (OSError, ValueError, KeyError):
+        return False
+
+
+def parity_report(model_path, compact_path=COMPACT_MODEL_PATH, data_path='.', latency_sample=500,
+                  min_agreement=MIN_AGREEMENT):
+    """Compare the export with the pipeline and record whether it may replace it.
+
+    The result is written to PARITY_FILE in the export; the export is approved
+    when at least min_agreement of the dataset's titles get the same label.
+    """
+    import joblib
+
+    titles = data_loader.load_combined_dataset(data_path)['title'].tolist()
+    original = joblib.load(model_path)
+    compact = CompactClusterModel(compact_path)
+
+    original_labels = original.predict(titles)
+    compact_labels = compact.predict(titles)
+    agreement = float(np.mean(original_labels == compact_labels))
+
+    sample = titles[:latency_sample]
+    rows = [
+        ('original', model_path, measure_load('original', model_path), predict_latency(original, sample)),
+        ('compact', compact_path, measure_load('compact', compact_path), predict_latency(compact, sample)),
+    ]
+
+    print(f"Label agreement on {len(titles)} titles: {agreement:.2%} "
+          f"({int((original_labels != compact_labels).sum())} differ)")
+    print(f"{'model':<10}{'load (s)':>10}{'RSS (MB)':>10}{'p50 (ms)':>10}{'p95 (ms)':>10}")
+    for name, _, (load_time, rss), (p50, p95) in rows:
+        print(f"{name:<10}{load_time:>10.3f}{rss / 2 ** 20:>10.1f}{p50:>10.3f}{p95:>10.3f}")
+
+    passed = agreement >= min_agreement
+    with open(os.path.join(compact_path, PARITY_FILE), 'w') as f:
+        json.dump({'agreement': agreement, 'min_agreement': min_agreement, 'passed': passed,
+                   'n_titles': len(titles), 'model': _model_stamp(model_path)}, f, indent=2)
+    print(f"Parity {'passed' if passed else 'FAILED'} (minimum {min_agreement:.2%}); "
+          f"{'serving' if passed else 'not serving'} {compact_path}")
+    return agreement
+
+
+def main():
+    import joblib
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('command', choices=['export', 'report'])
+    parser.add_argument('--model', default=data_loader.MODEL_PATH)
+    parser.add_argument('--output', default=COMPACT_MODEL_PATH)
+    parser.add_argument('--data-path', default='.')
+    parser.add_argument('--prune', type=float, default=0.0,
+                        help="Drop the weights of terms whose largest weight is below this fraction of the "
+                             "overall largest (their idf is kept so titles are normalised as in the pipeline)")
+    parser.add_argument('--hashing', action='store_true', help="Use a hashing featurizer instead of the vocabulary")
+    parser.add_argument('--n-features', type=int, default=2 ** 18)
+    parser.add_argument('--min-agreement', type=float, default=MIN_AGREEMENT,
+                        help="Label agreement the export needs before load_model serves it")
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        config = export(joblib.load(args.model), args.output, args.prune, args.hashing, args.n_features)
+        print(f"Exported {config['n_terms']}/{config['n_terms_original']} terms "
+              f"({config['featurizer']} featurizer) to {args.output}")
+    parity_report(args.model, args.output, args.data_path, min_agreement=args.min_agreement)
+
+
+if __name__ == '__main__':
+    main()
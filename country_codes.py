@@ -0,0 +1,94 @@
+"""Offline country name -> ISO 3166-1 alpha-3 resolution and local GeoJSON for choropleths.
+
+assets/geo/country_codes.csv maps official, common and alias country names to
+ISO-3 codes (from the ISO 3166 tables plus aliases seen in Scopus exports).
+assets/geo/countries.geojson holds the Natural Earth 1:110m country outlines
+(public domain) with each feature's id set to its ISO-3 code.
+
+Report names in the dataset that cannot be resolved:  python country_codes.py
+"""
+import json
+import re
+import unicodedata
+from functools import lru_cache
+
+import pandas as pd
+
+COUNTRY_TABLE_PATH = 'assets/geo/country_codes.csv'
+GEOJSON_PATH = 'assets/geo/countries.geojson'
+
+
+def normalize_name(name):
+    """Case-, accent- and punctuation-insensitive key for matching country names."""
+    name = unicodedata.normalize('NFKD', str(name)).encode('ascii', 'ignore').decode('ascii')
+    name = re.sub(r'[^a-z0-9]+', ' ', name.casefold())
+    return re.sub(r'^the ', '', name.strip())
+
+
+@lru_cache(maxsize=None)
+def load_country_table(path=COUNTRY_TABLE_PATH):
+    table = pd.read_csv(path, keep_default_na=False)
+    return dict(zip(table['name'].map(normalize_name), table['iso3']))
+
+
+@lru_cache(maxsize=None)
+def load_geojson(path=GEOJSON_PATH):
+    with open(path) as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=None)
+def outline_codes(path=GEOJSON_PATH):
+    """ISO-3 codes that have an outline in the bundled GeoJSON."""
+    return frozenset(feature['id'] for feature in load_geojson(path)['features'])
+
+
+def to_iso3(countries, path=COUNTRY_TABLE_PATH):
+    """ISO-3 code for every value of the countries Series (NaN where unresolved).
+
+    Each distinct name is matched once, so the cost scales with the number of
+    countries rather than the number of rows.
+    """
+    table = load_country_table(path)
+    codes, names = pd.factorize(countries)
+    resolved = pd.Series([table.get(normalize_name(name)) for name in names], dtype=object)
+    iso3 = resolved.take(codes).to_numpy()
+    iso3[codes < 0] = None
+    return pd.Series(iso3, index=countries.index, name='iso3')
+
+
+def unresolved_countries(df):
+    """Publication counts of country names that did not resolve to an ISO-3 code."""
+    missing = df.loc[df['iso3'].isna() & (df['country'] != 'Unknown'), 'country']
+    return missing.value_counts()
+
+
+def country_counts(df):
+    """Publications per resolved country, ready for a choropleth keyed by ISO-3."""
+    counts = df.dropna(subset=['iso3']).groupby('iso3').agg(
+        country=('country', 'first'),
+        publication_count=('country', 'size'),
+        latitude=('latitude', 'mean'),
+        longitude=('longitude', 'mean'),
+    ).reset_index()
+    return counts.sort_values('publication_count', ascending=False, ignore_index=True)
+
+
+def main():
+    import data_loader
+
+    df = data_loader.load_combined_dataset()
+    unresolved = unresolved_countries(df)
+    if unresolved.empty:
+        print(f"All {df['country'].nunique()} country names resolved to ISO-3 codes")
+    else:
+        print(f"{len(unresolved)} country names could not be resolved:")
+        print(unresolved.to_string())
+
+    missing_outlines = sorted(set(df['iso3'].dropna()) - outline_codes())
+    if missing_outlines:
+        print(f"No outline in {GEOJSON_PATH} (too small for 1:110m) for: {', '.join(missing_outlines)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+import hashlib
+import os
+import pandas as pd
+import joblib
+
+from country_codes import to_iso3
+
+DATA_PATTERN = 'cluster_final_prepared_{}_data.csv'
+DATA_YEARS = range(2013, 2024)
+MODEL_PATH = 'model_with_stopwords_removed_without_thousand_again.joblib'
+COMPACT_MODEL_PATH = 'compact_model'
+FILL_COLUMNS = ['title', 'author_name', 'affiliation', 'city', 'country']
+# Bump whenever clean_dataset changes its output so cached frames and aggregates are rebuilt
+DATASET_SCHEMA_VERSION = 1
+
+
+def dataset_files(base_path='.'):
+    """Paths of the yearly CSV files that exist under base_path, keyed by year."""
+    files = {}
+    for year in DATA_YEARS:
+        filepath = os.path.join(base_path, DATA_PATTERN.format(year))
+        if os.path.exists(filepath):
+            files[year] = filepath
+    return files
+
+
+def dataset_mtime(base_path='.'):
+    """Latest modification time of the yearly CSV files (0 if there are none)."""
+    return max((os.path.getmtime(path) for path in dataset_files(base_path).values()), default=0)
+
+
+def dataset_version(base_path='.'):
+    """Hash identifying the loaded dataset: the yearly CSV files (name, size and mtime) and the cleaning schema."""
+    digest = hashlib.sha1(f"schema:{DATASET_SCHEMA_VERSION};".encode())
+    for year, filepath in dataset_files(base_path).items():
+        stat = os.stat(filepath)
+        digest.update(f"{year}:{os.path.basename(filepath)}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()
+
+
+def load_combined_dataset(base_path='.', on_error=None):
+    """Load and merge CSV files for multiple years.
+
+    on_error(filepath, exception) is called for files that fail to parse;
+    an empty DataFrame is returned when nothing could be loaded.
+    """
+    dataframes = []
+
+    for year, filepath in dataset_files(base_path).items():
+        try:
+            df = pd.read_csv(filepath)
+            df['year'] = year
+            dataframes.append(df)
+        except Exception as e:
+            if on_error is not None:
+                on_error(filepath, e)
+
+    if not dataframes:
+        return pd.DataFrame()
+
+    return clean_dataset(pd.concat(dataframes, ignore_index=True))
+
+
+def clean_dataset(df):
+    """Parse dates, drop undated rows, fill missing text fields and resolve ISO-3 codes.
+
+    Works row by row, so it gives the same result on the whole dataset or on
+    any chunk of it.
+    """
+    df['publication_date'] = pd.to_datetime(df['publication_date'], errors='coerce')
+    df = df.dropna(subset=['publication_date'])
+    for col in FILL_COLUMNS:
+        df[col] = df[col].fillna('Unknown')
+    df['iso3'] = to_iso3(df['country'])
+    return df
+
+
+def load_model(path=MODEL_PATH, compact_path=COMPACT_MODEL_PATH):
+    """Load the cluster model, preferring the compact export once its parity report has passed."""
+    if compact_path and os.path.isdir(compact_path):
+        from compact_model import CompactClusterModel, parity_passed
+        if parity_passed(compact_path, path):
+            return CompactClusterModel(compact_path)
+    return joblib.load(path)
@@ -0,0 +1,252 @@
+"""Out-of-core queries over the dataset stored as a year-partitioned Parquet dataset.
+
+The yearly CSVs are converted once, streaming one CSV block at a time, into a
+Parquet dataset partitioned by year (year=2017/part-0.parquet, ...).
+DatasetScanner answers the dashboard's filters, counts, aggregations, keyword
+search and table pages through the pyarrow dataset API:
+  * filters are pushed down as dataset expressions, so whole year partitions
+    are skipped and only the columns a query needs are read;
+  * rows are scanned in bounded record batches and folded into running totals,
+    so memory depends on the batch size and the number of groups, not on the
+    number of rows;
+  * a table page materializes only its own rows; partitions before the page are
+    skipped by counting their matches instead of reading them.
+
+Convert the CSVs:  python dataset_scanner.py convert
+Run the dashboard on it:  streamlit run visualize.py -- --out-of-core
+"""
+import argparse
+import hashlib
+import os
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+
+import data_loader
+
+PARQUET_DIR = 'dataset_parquet'
+BATCH_SIZE = 64 * 1024
+CSV_BLOCK_SIZE = 16 * 2 ** 20
+SEARCH_COLUMNS = ('title', 'affiliation', 'city')
+
+SCHEMA = pa.schema([
+    ('author_name', pa.string()),
+    ('affiliation', pa.string()),
+    ('city', pa.string()),
+    ('country', pa.string()),
+    ('publication_date', pa.timestamp('ns')),
+    ('title', pa.string()),
+    ('latitude', pa.float64()),
+    ('longitude', pa.float64()),
+    ('cluster', pa.int64()),
+    ('iso3', pa.string()),
+    ('year', pa.int32()),
+])
+# Text columns are read as strings even when a block happens to look numeric
+CSV_COLUMN_TYPES = {name: pa.string() for name in ['publication_date'] + data_loader.FILL_COLUMNS}
+
+
+def _csv_batches(files):
+    """Cleaned record batches of every yearly CSV, one CSV block at a time."""
+    for year, filepath in files.items():
+        reader = pacsv.open_csv(
+            filepath,
+            read_options=pacsv.ReadOptions(block_size=CSV_BLOCK_SIZE),
+            convert_options=pacsv.ConvertOptions(column_types=CSV_COLUMN_TYPES),
+        )
+        for batch in reader:
+            chunk = data_loader.clean_dataset(batch.to_pandas())
+            chunk['year'] = year
+            yield pa.RecordBatch.from_pandas(chunk, schema=SCHEMA, preserve_index=False)
+
+
+def convert(base_path='.', output_dir=PARQUET_DIR):
+    """Stream the yearly CSVs under base_path into a year-partitioned Parquet dataset."""
+    files = data_loader.dataset_files(base_path)
+    if not files:
+        raise FileNotFoundError(f"No {data_loader.DATA_PATTERN.format('*')} files under {base_path!r}")
+    ds.write_dataset(
+        _csv_batches(files), output_dir, schema=SCHEMA, format='parquet',
+        partitioning=['year'], partitioning_flavor='hive',
+        existing_data_behavior='delete_matching',
+    )
+
+
+def filter_expression(year=None, date_from=None, date_to=None, countries=None, cities=None,
+                      clusters=None, keyword=None, search_columns=SEARCH_COLUMNS):
+    """Dataset filter for the dashboard's selections (None when nothing is selected).
+
+    date_to is inclusive; keyword matches any of search_columns, case-insensitively.
+    """
+    conditions = []
+    if year is not None:
+        conditions.append(ds.field('year') == int(year))
+    if date_from is not None:
+        conditions.append(ds.field('publication_date') >= pa.scalar(pd.Timestamp(date_from), pa.timestamp('ns')))
+    if date_to is not None:
+        end = pd.Timestamp(date_to) + pd.Timedelta(days=1)
+        conditions.append(ds.field('publication_date') < pa.scalar(end, pa.timestamp('ns')))
+    for column, values in (('country', countries), ('city', cities), ('cluster', clusters)):
+        if values:
+            conditions.append(ds.field(column).isin(list(values)))
+    if keyword:
+        matches = [pc.match_substring(ds.field(column), keyword, ignore_case=True) for column in search_columns]
+        conditions.append(_combine(matches, 'or'))
+    return _combine(conditions, 'and') if conditions else None
+
+
+def _combine(expressions, how):
+    combined = expressions[0]
+    for expression in expressions[1:]:
+        combined = (combined & expression) if how == 'and' else (combined | expression)
+    return combined
+
+
+class DatasetScanner:
+
+    def __init__(self, path=PARQUET_DIR, batch_size=BATCH_SIZE):
+        if not os.path.isdir(path):
+            raise FileNotFoundError(f"No Parquet dataset at {path!r}; run `python dataset_scanner.py convert` first")
+        self.path = path
+        self.batch_size = batch_size
+        self.dataset = ds.dataset(path, format='parquet', partitioning='hive')
+
+    def version(self):
+        """Hash of the Parquet files (name, size and mtime), for keying cached results."""
+        digest = hashlib.sha1()
+        for filepath in sorted(self.dataset.files):
+            stat = os.stat(filepath)
+            digest.update(f"{filepath}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+        return digest.hexdigest()
+
+    def _batches(self, columns, filter=None):
+        # One batch and one file in flight at a time keeps the scan's memory bounded
+        return self.dataset.to_batches(
+            columns=columns, filter=filter, batch_size=self.batch_size,
+            batch_readahead=1, fragment_readahead=1,
+        )
+
+    def years(self):
+        """Years present in the dataset, read from the partition directories."""
+        return sorted({
+            ds.get_partition_keys(fragment.partition_expression)['year']
+            for fragment in self.dataset.get_fragments()
+        })
+
+    def count(self, filter=None):
+        return self.dataset.count_rows(filter=filter)
+
+    def date_bounds(self, filter=None):
+        """Earliest and latest publication date (as datetime.date) of the matching rows."""
+        low = high = None
+        for batch in self._batches(['publication_date'], filter):
+            if batch.num_rows:
+                bounds = pc.min_max(batch.column(0))
+                low = bounds['min'].as_py() if low is None else min(low, bounds['min'].as_py())
+                high = bounds['max'].as_py() if high is None else max(high, bounds['max'].as_py())
+        return (pd.Timestamp(low).date(), pd.Timestamp(high).date()) if low is not None else (None, None)
+
+    def group_totals(self, by, filter=None, mean_columns=()):
+        """Row count (and means of mean_columns) per value of by, largest group first.
+
+        by is a column or a list of columns; several columns give a MultiIndex.
+        Each batch is reduced with a group-by and only the per-group partial sums
+        are kept, so memory grows with the number of groups rather than rows.
+        """
+        keys = [by] if isinstance(by, str) else list(by)
+        partials = []
+        aggregations = [([], 'count_all')] + [(column, agg) for column in mean_columns for agg in ('sum', 'count')]
+        for batch in self._batches([*keys, *mean_columns], filter):
+            if batch.num_rows:
+                partial = pa.Table.from_batches([batch]).group_by(keys).aggregate(aggregations).to_pandas()
+                partials.append(partial.groupby(keys).sum())
+                if len(partials) > 1:
+                    partials = [pd.concat(partials).groupby(level=list(range(len(keys)))).sum()]
+        if not partials:
+            index = pd.MultiIndex.from_tuples([], names=keys) if len(keys) > 1 else pd.Index([], name=by)
+            return pd.DataFrame(columns=['count', *mean_columns], index=index)
+
+        totals = partials[0]
+        result = pd.DataFrame({'count': totals['count_all']})
+        for column in mean_columns:
+            result[column] = totals[f'{column}_sum'] / totals[f'{column}_count']
+        return result.sort_values('count', ascending=False, kind='stable')
+
+    def value_counts(self, column, filter=None, top=None):
+        counts = self.group_totals(column, filter)['count']
+        return counts.head(top) if top else counts
+
+    def distinct(self, column, filter=None):
+        """Sorted distinct values of column among the matching rows."""
+        values = set()
+        for batch in self._batches([column], filter):
+            values.update(pc.unique(batch.column(0)).to_pylist())
+        return sorted(value for value in values if value is not None)
+
+    def page(self, filter=None, offset=0, limit=50, columns=None):
+        """Rows offset .. offset + limit of the matching rows, in partition order."""
+        columns = columns or self.dataset.schema.names
+        batches = []
+        for fragment in self.dataset.get_fragments(filter=filter):
+            # Counting reads only the filter columns; skip partitions wholly before the page
+            matches = ds.Scanner.from_fragment(fragment, schema=self.dataset.schema, filter=filter).count_rows()
+            if offset >= matches:
+                offset -= matches
+                continue
+            scanner = ds.Scanner.from_fragment(
+                fragment, schema=self.dataset.schema, columns=columns, filter=filter, batch_size=self.batch_size,
+            )
+            for batch in scanner.to_batches():
+                if offset >= batch.num_rows:
+                    offset -= batch.num_rows
+                    continue
+                batch = batch.slice(offset, limit)
+                offset = 0
+                batches.append(batch)
+                limit -= batch.num_rows
+                if limit <= 0:
+                    break
+            if limit <= 0:
+                break
+        return pa.Table.from_batches(batches, schema=pa.schema([self.dataset.schema.field(column) for column in columns])).to_pandas()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert the yearly CSVs to a partitioned Parquet dataset and query it")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    convert_parser = subparsers.add_parser('convert', help="Stream the yearly CSVs into a Parquet dataset")
+    convert_parser.add_argument('--base-path', default='.')
+    convert_parser.add_argument('--output', default=PARQUET_DIR)
+    stats_parser = subparsers.add_parser('stats', help="Scan the dataset and report timings and peak Arrow memory")
+    stats_parser.add_argument('--path', default=PARQUET_DIR)
+    stats_parser.add_argument('--keyword', default='network')
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        convert(args.base_path, args.output)
+        print(f"Wrote {DatasetScanner(args.output).count():,} rows to {args.output}")
+        return
+
+    scanner = DatasetScanner(args.path)
+    pool = pa.default_memory_pool()
+    queries = {
+        'count': lambda: scanner.count(),
+        'clusters': lambda: scanner.value_counts('cluster'),
+        'top authors': lambda: scanner.value_counts('author_name', top=10),
+        'countries': lambda: scanner.group_totals('iso3', mean_columns=('latitude', 'longitude')),
+        f"search '{args.keyword}'": lambda: scanner.count(filter_expression(keyword=args.keyword)),
+        'last page': lambda: scanner.page(offset=max(scanner.count() - 50, 0)),
+    }
+    for name, query in queries.items():
+        start = time.perf_counter()
+        query()
+        print(f"{name:<20}{(time.perf_counter() - start) * 1000:>8.0f} ms")
+    print(f"Peak Arrow memory: {pool.max_memory() / 2 ** 20:.1f} MB ({pool.backend_name} pool)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Date-range counts and row retrieval backed by prefix sums.
+
+For each granularity (day, month, quarter) the index stores cumulative
+publication counts per date bucket, overall and per value of each facet
+column, so the number of papers in any range is a difference of two array
+entries. Rows are kept sorted by publication date so the rows of a range are a
+contiguous slice found by binary search.
+"""
+import numpy as np
+import pandas as pd
+
+GRANULARITIES = ('day', 'month', 'quarter')
+FACET_COLUMNS = ('cluster', 'country')
+
+
+def _bucket(dates, granularity):
+    """Integer bucket number of each datetime64[D] date (days, months or quarters since the epoch)."""
+    if granularity == 'day':
+        return dates.astype('datetime64[D]').astype(np.int64)
+    months = dates.astype('datetime64[M]').astype(np.int64)
+    if granularity == 'month':
+        return months
+    if granularity == 'quarter':
+        return months // 3
+    raise ValueError(f"Unknown granularity {granularity!r}, expected one of {GRANULARITIES}")
+
+
+class DateIndex:
+
+    def __init__(self, df, date_column='publication_date', facets=FACET_COLUMNS):
+        dates = df[date_column].to_numpy().astype('datetime64[D]')
+        self.order = np.argsort(dates, kind='stable')
+        self.sorted_dates = dates[self.order]
+        self.min_date = self.sorted_dates[0] if len(dates) else None
+        self.max_date = self.sorted_dates[-1] if len(dates) else None
+
+        self.facet_values = {}
+        facet_codes = {}
+        for facet in facets:
+            codes, uniques = pd.factorize(df[facet])
+            self.facet_values[facet] = pd.Index(uniques)
+            facet_codes[facet] = codes
+
+        # cumulative[granularity][facet][value, b] = rows of that value in buckets < first_bucket + b
+        self.first_bucket = {}
+        self.cumulative = {}
+        for granularity in GRANULARITIES:
+            buckets = _bucket(dates, granularity)
+            first = buckets.min() if len(buckets) else 0
+            offsets = buckets - first
+            n_buckets = int(offsets.max()) + 1 if len(offsets) else 0
+            self.first_bucket[granularity] = first
+
+            totals = np.bincount(offsets, minlength=n_buckets)
+            self.cumulative[granularity] = {None: np.concatenate([[0], np.cumsum(totals)]).astype(np.int32)}
+            for facet, codes in facet_codes.items():
+                known = codes >= 0
+                counts = np.zeros((len(self.facet_values[facet]), n_buckets), dtype=np.int32)
+                np.add.at(counts, (codes[known], offsets[known]), 1)
+                cumulative = np.zeros((counts.shape[0], n_buckets + 1), dtype=np.int32)
+                np.cumsum(counts, axis=1, out=cumulative[:, 1:])
+                self.cumulative[granularity][facet] = cumulative
+
+    def _bounds(self, start, end, granularity):
+        """Prefix-sum positions for the whole buckets covering [start, end]."""
+        n = len(self.cumulative[granularity][None]) - 1
+        first = self.first_bucket[granularity]
+        lo = _bucket(np.datetime64(start, 'D'), granularity) - first
+        hi = _bucket(np.datetime64(end, 'D'), granularity) - first + 1
+        return int(np.clip(lo, 0, n)), int(np.clip(hi, 0, n))
+
+    def count(self, start, end, granularity='day', facet=None, value=None):
+        """Papers published in [start, end] (snapped to whole buckets), optionally for one facet value."""
+        lo, hi = self._bounds(start, end, granularity)
+        if hi <= lo:
+            return 0
+        cumulative = self.cumulative[granularity][facet]
+        if facet is None:
+            return int(cumulative[hi] - cumulative[lo])
+        if value not in self.facet_values[facet]:
+            return 0
+        row = self.facet_values[facet].get_loc(value)
+        return int(cumulative[row, hi] - cumulative[row, lo])
+
+    def facet_counts(self, facet, start, end, granularity='day'):
+        """Papers per value of facet in [start, end], largest first (zeros dropped)."""
+        lo, hi = self._bounds(start, end, granularity)
+        cumulative = self.cumulative[granularity][facet]
+        counts = pd.Series(cumulative[:, hi] - cumulative[:, lo] if hi > lo else 0,
+                           index=self.facet_values[facet], dtype=np.int64)
+        return counts[counts > 0].sort_values(ascending=False, kind='stable')
+
+    def periods(self, granularity):
+        """Start date of every bucket between the first and last publication."""
+        if self.min_date is None:
+            return []
+        freq = {'day': 'D', 'month': 'MS', 'quarter': 'QS'}[granularity]
+        start = pd.Timestamp(self.min_date).to_period(freq[0]).start_time
+        return list(pd.date_range(start, pd.Timestamp(self.max_date), freq=freq).date)
+
+    def period_end(self, period_start, granularity):
+        """Last day of the bucket starting at period_start."""
+        offset = {'day': pd.DateOffset(days=0), 'month': pd.offsets.MonthEnd(0), 'quarter': pd.offsets.QuarterEnd(0)}
+        return (pd.Timestamp(period_start) + offset[granularity]).date()
+
+    def rows(self, start, end):
+        """Positional row numbers published in [start, end] (inclusive days), in date order."""
+        lo = np.searchsorted(self.sorted_dates, np.datetime64(start, 'D'), side='left')
+        hi = np.searchsorted(self.sorted_dates, np.datetime64(end, 'D'), side='right')
+        return self.order[lo:hi]
@@ -0,0 +1,193 @@
+"""Headless concurrent-session load test for the Streamlit dashboard.
+
+Each simulated session drives visualize.py through streamlit's AppTest with a
+scripted interaction trace (page switches, year slider moves and keyword
+searches, each of which also predicts the keyword's cluster) and times every
+rerun. AppTest keeps process-global
+runtime state, so every session runs in its own process; st.cache_* caches are
+therefore per session, which makes the numbers a conservative upper bound.
+
+Example:  python load_test.py --sessions 8 --iterations 3 --trace mixed
+"""
+import argparse
+import multiprocessing
+import queue
+import random
+import threading
+import time
+import traceback
+
+import numpy as np
+
+PAGES = ["Cluster Analysis", "Geographic Analysis", "Author and Affiliation Insights", "Topic/Keyword Filter"]
+KEYWORDS = ["network", "learning", "power", "software", "design", "energy", "control", "education"]
+YEARS = range(2013, 2018)
+
+# Each step is (action, argument); None arguments are drawn at random per session
+TRACES = {
+    'browse': [('page', page) for page in PAGES] + [('year', None), ('page', None), ('year', None)],
+    'search': [('page', "Topic/Keyword Filter"), ('keyword', None), ('year', None), ('keyword', None)],
+}
+TRACES['mixed'] = TRACES['browse'] + TRACES['search']
+
+
+def _widget(elements, label_prefix):
+    return next(element for element in elements if element.label.startswith(label_prefix))
+
+
+def apply_step(at, action, argument, rng):
+    """Apply one interaction to the AppTest session (without rerunning it)."""
+    if action == 'page':
+        _widget(at.sidebar.radio, "Select Analysis View").set_value(argument or rng.choice(PAGES))
+    elif action == 'year':
+        _widget(at.sidebar.slider, "Select Year").set_value(argument or rng.choice(YEARS))
+    elif action == 'keyword':
+        # The Topic/Keyword page also predicts the cluster of every searched keyword
+        _widget(at.text_input, "Enter research topic").set_value(argument or rng.choice(KEYWORDS))
+    else:
+        raise ValueError(f"Unknown trace action {action!r}")
+
+
+def run_session(script, trace, iterations, seed, timeout, barrier, results):
+    rng = random.Random(seed)
+    timings, errors = [], []
+    peak_rss = [0]
+    process = None
+    stop = threading.Event()
+    started = time.time()
+
+    def sample_memory():
+        while not stop.wait(0.05):
+            peak_rss[0] = max(peak_rss[0], process.memory_info().rss)
+
+    def rerun(at, label):
+        start = time.perf_counter()
+        at.run(timeout=timeout)
+        # A rerun that raised stopped early, so it is flagged rather than timed as a normal one
+        failed = bool(at.exception)
+        timings.append((label, time.perf_counter() - start, failed))
+        if failed:
+            errors.append(f"{label}: {at.exception[0].value}")
+
+    # Everything that can fail is inside the try, so every session reports back
+    try:
+        import psutil
+        from streamlit.testing.v1 import AppTest
+
+        process = psutil.Process()
+        peak_rss[0] = process.memory_info().rss
+        threading.Thread(target=sample_memory, daemon=True).start()
+        # Raises BrokenBarrierError once the barrier times out (e.g. another session failed to start)
+        barrier.wait()
+        started = time.time()
+        at = AppTest.from_file(script, default_timeout=timeout)
+        rerun(at, 'initial')
+        for _ in range(iterations):
+            for action, argument in TRACES[trace]:
+                apply_step(at, action, argument, rng)
+                rerun(at, action)
+    except Exception:
+        errors.append(traceback.format_exc(limit=3))
+    finally:
+        stop.set()
+        if process is not None:
+            peak_rss[0] = max(peak_rss[0], process.memory_info().rss)
+        results.put({
+            'seed': seed, 'timings': timings, 'errors': errors, 'peak_rss': peak_rss[0],
+            'started': started, 'finished': time.time(),
+        })
+
+
+def run_load_test(script='visualize.py', sessions=4, trace='mixed', iterations=1, timeout=120, seed=0):
+    """Run the sessions and return their reports, the wall time and each worker's exit code."""
+    ctx = multiprocessing.get_context('spawn')
+    # Sessions that are not all up within the timeout fail instead of waiting forever
+    barrier = ctx.Barrier(sessions, timeout=timeout)
+    results = ctx.Queue()
+    workers = [
+        ctx.Process(target=run_session, args=(script, trace, iterations, seed + i, timeout, barrier, results))
+        for i in range(sessions)
+    ]
+    for worker in workers:
+        worker.start()
+    reports = []
+    # Poll with a timeout so a worker that dies without reporting (e.g. killed) cannot hang the run
+    while len(reports) < len(workers):
+        try:
+            reports.append(results.get(timeout=1))
+        except queue.Empty:
+            if not any(worker.is_alive() for worker in workers):
+                break
+    for worker in workers:
+        worker.join()
+    exit_codes = {seed + i: worker.exitcode for i, worker in enumerate(workers)}
+    # Sessions wait on a barrier after importing streamlit, so wall time covers only the reruns
+    wall_time = max(r['finished'] for r in reports) - min(r['started'] for r in reports) if reports else 0.0
+    return reports, wall_time, exit_codes
+
+
+def summarize(reports, wall_time, exit_codes=None):
+    """Print throughput and latency of the successful reruns and the failures per action."""
+    timings = [timing for report in reports for timing in report['timings']]
+    succeeded = [(label, seconds) for label, seconds, failed in timings if not failed]
+    latencies = np.array([seconds for _, seconds in succeeded]) * 1000
+    by_action, failures = {}, {}
+    for label, seconds, failed in timings:
+        by_action.setdefault(label, [])
+        failures[label] = failures.get(label, 0) + failed
+        if not failed:
+            by_action[label].append(seconds * 1000)
+
+    print(f"Sessions: {len(reports)}   Reruns: {len(timings)}   Failed: {sum(failures.values())}   "
+          f"Wall time: {wall_time:.1f}s")
+    if len(latencies):
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        print(f"Throughput: {len(succeeded) / wall_time:.2f} successful reruns/s")
+        print(f"Rerun latency (ms): p50 {p50:.0f}   p95 {p95:.0f}   p99 {p99:.0f}   max {latencies.max():.0f}")
+    if timings:
+        print(f"\n{'action':<12}{'reruns':>8}{'failed':>8}{'p50 (ms)':>10}{'p95 (ms)':>10}{'p99 (ms)':>10}")
+        for label, values in sorted(by_action.items()):
+            if values:
+                p50, p95, p99 = np.percentile(values, [50, 95, 99])
+                percentiles = f"{p50:>10.0f}{p95:>10.0f}{p99:>10.0f}"
+            else:
+                percentiles = f"{'-':>10}{'-':>10}{'-':>10}"
+            print(f"{label:<12}{len(values) + failures[label]:>8}{failures[label]:>8}{percentiles}")
+
+    rss = np.array([report['peak_rss'] for report in reports]) / 2 ** 20
+    if len(rss):
+        print(f"\nPeak RSS per session process (MB): mean {rss.mean():.0f}   max {rss.max():.0f}   total {rss.sum():.0f}")
+
+    # Sessions are identified by their seed; a crashed worker may have sent no report at all
+    reported = {report['seed'] for report in reports}
+    for session, code in sorted((exit_codes or {}).items()):
+        if code != 0 or session not in reported:
+            status = "sent no report" if session not in reported else "reported"
+            print(f"Session {session} exited with code {code} ({status})")
+
+    errors = [error for report in reports for error in report['errors']]
+    if errors:
+        print(f"\n{len(errors)} errors:")
+        for error in errors[:10]:
+            print(f"  {error}")
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--script', default='visualize.py')
+    parser.add_argument('--sessions', type=int, default=4, help="Concurrent simulated sessions")
+    parser.add_argument('--trace', choices=sorted(TRACES), default='mixed')
+    parser.add_argument('--iterations', type=int, default=1, help="Times each session replays the trace")
+    parser.add_argument('--timeout', type=float, default=120, help="Per-rerun timeout in seconds")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    reports, wall_time, exit_codes = run_load_test(
+        args.script, args.sessions, args.trace, args.iterations, args.timeout, args.seed
+    )
+    summarize(reports, wall_time, exit_codes)
+
+
+if __name__ == '__main__':
+    main()
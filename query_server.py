@@ -0,0 +1,355 @@
+"""Headless HTTP query API over the research dataset and cluster model.
+
+Serves the same filters, counts, keyword search and cluster predictions as
+visualize.py without going through the Streamlit UI. The dataset and model are
+loaded once at startup and shared by every request. Keyword search (q) is a
+case-insensitive literal substring match over title, affiliation and city,
+exactly as on the dashboard's Topic/Keyword page.
+
+Run with:  python query_server.py --port 8600
+"""
+import argparse
+import hashlib
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import format_datetime, parsedate_to_datetime
+from datetime import datetime, timezone
+
+import pandas as pd
+import tornado.ioloop
+import tornado.web
+from cachetools import LRUCache
+
+import data_loader
+
+logger = logging.getLogger(__name__)
+
+FILTER_COLUMNS = ['country', 'city', 'cluster', 'author_name', 'affiliation']
+SEARCH_COLUMNS = ['title', 'affiliation', 'city']
+AGGREGATE_COLUMNS = ['country', 'city', 'cluster', 'author_name', 'affiliation', 'year']
+RECORD_COLUMNS = ['author_name', 'affiliation', 'city', 'country', 'publication_date', 'title',
+                  'latitude', 'longitude', 'cluster', 'year']
+MAX_LIMIT = 1000
+MAX_BATCH = 1000
+
+
+class QueryError(ValueError):
+    """Invalid query parameters; reported to the client as HTTP 400."""
+
+
+class QueryService:
+    """Preloaded dataset and model plus the query logic shared by all handlers."""
+
+    def __init__(self, df, model=None, last_modified=None):
+        self.df = df
+        self.model = model
+        self.last_modified = (last_modified or datetime.now(timezone.utc)).replace(microsecond=0)
+        self._predict_lock = threading.Lock()
+
+    @classmethod
+    def from_path(cls, base_path='.', model_path=data_loader.MODEL_PATH):
+        df = data_loader.load_combined_dataset(
+            base_path,
+            on_error=lambda filepath, e: logger.warning("Error loading %s: %s", filepath, e)
+        )
+        if df.empty:
+            raise RuntimeError("No data files could be loaded!")
+        df["year"] = df["publication_date"].dt.year
+
+        try:
+            model = data_loader.load_model(model_path)
+        except (OSError, ValueError) as e:
+            logger.warning("Cluster model unavailable, /predict disabled: %s", e)
+            model = None
+
+        mtime = data_loader.dataset_mtime(base_path)
+        return cls(df, model, datetime.fromtimestamp(mtime, timezone.utc))
+
+    # Query helpers
+    def _mask(self, params):
+        df = self.df
+        mask = pd.Series(True, index=df.index)
+
+        if 'year' in params:
+            mask &= df['year'] == _to_int(params, 'year')
+        if 'year_from' in params:
+            mask &= df['year'] >= _to_int(params, 'year_from')
+        if 'year_to' in params:
+            mask &= df['year'] <= _to_int(params, 'year_to')
+
+        for col in FILTER_COLUMNS:
+            values = params.get(col)
+            if values:
+                if col == 'cluster':
+                    values = [_to_int({col: [v]}, col) for v in values]
+                mask &= df[col].isin(values)
+
+        keyword = _first(params, 'q')
+        if keyword:
+            keyword_mask = pd.Series(False, index=df.index)
+            for col in SEARCH_COLUMNS:
+                keyword_mask |= df[col].str.contains(keyword, case=False, na=False, regex=False)
+            mask &= keyword_mask
+        return mask
+
+    def _records(self, rows, params):
+        limit = _to_int(params, 'limit', 100)
+        offset = _to_int(params, 'offset', 0)
+        if limit < 1:
+            raise QueryError(f"Parameter 'limit' must be at least 1, got {limit}")
+        if offset < 0:
+            raise QueryError(f"Parameter 'offset' must not be negative, got {offset}")
+        limit = min(limit, MAX_LIMIT)
+        page = rows.iloc[offset:offset + limit][RECORD_COLUMNS].copy()
+        page['publication_date'] = page['publication_date'].dt.strftime('%Y-%m-%d')
+        page = page.astype(object).where(page.notna(), None)
+        return {
+            'total': int(len(rows)),
+            'offset': offset,
+            'limit': limit,
+            'records': page.to_dict(orient='records'),
+        }
+
+    # Endpoints
+    def filter(self, params):
+        return self._records(self.df[self._mask(params)], params)
+
+    def search(self, params):
+        if not _first(params, 'q'):
+            raise QueryError("Missing required parameter 'q'")
+        return self._records(self.df[self._mask(params)], params)
+
+    def aggregate(self, params):
+        by = _first(params, 'by', 'country')
+        if by not in AGGREGATE_COLUMNS:
+            raise QueryError(f"Cannot aggregate by '{by}', expected one of {AGGREGATE_COLUMNS}")
+        top = _to_int(params, 'top', 0)
+        if top < 0:
+            raise QueryError(f"Parameter 'top' must not be negative, got {top}")
+
+        counts = self.df.loc[self._mask(params), by].value_counts()
+        if top:
+            counts = counts.head(top)
+        return {
+            'by': by,
+            'total': int(counts.sum()),
+            'counts': [{'value': _plain(value), 'count': int(count)} for value, count in counts.items()],
+        }
+
+    def predict(self, titles):
+        if self.model is None:
+            raise RuntimeError("Cluster model is not loaded")
+        # sklearn estimators are not guaranteed thread-safe for concurrent predict calls
+        with self._predict_lock:
+            clusters = self.model.predict(titles)
+        return {'clusters': [_plain(c) for c in clusters]}
+
+
+def _first(params, name, default=None):
+    values = params.get(name)
+    return values[0] if values else default
+
+
+def _to_int(params, name, default=None):
+    value = _first(params, name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise QueryError(f"Parameter '{name}' must be an integer, got {value!r}")
+
+
+def _plain(value):
+    """Convert numpy scalars to their Python equivalents for JSON encoding."""
+    return value.item() if hasattr(value, 'item') else value
+
+
+class ResponseCache:
+    """Thread-safe in-memory LRU cache of encoded responses keyed by normalized query."""
+
+    def __init__(self, maxsize=1024):
+        self._cache = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(endpoint, params):
+        # Filter columns are value sets, so their order is irrelevant; every other
+        # parameter is read through _first, so its order decides the response
+        normalized = sorted(
+            (name, sorted(values) if name in FILTER_COLUMNS else list(values)) for name, values in params.items()
+        )
+        return endpoint + '?' + json.dumps(normalized, ensure_ascii=False)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def put(self, key, body):
+        entry = (body, '"%s"' % hashlib.sha1(body).hexdigest())
+        with self._lock:
+            self._cache[key] = entry
+        return entry
+
+
+class BaseHandler(tornado.web.RequestHandler):
+
+    def initialize(self, service, cache):
+        self.service = service
+        self.cache = cache
+        self._etag = None
+
+    def query_params(self):
+        params = {}
+        for name, values in self.request.query_arguments.items():
+            values = [v.decode('utf-8') for v in values if v]
+            if values:
+                params[name] = values
+        return params
+
+    def compute_etag(self):
+        return self._etag or super().compute_etag()
+
+    def write_json(self, body):
+        self.set_header('Content-Type', 'application/json; charset=UTF-8')
+        self.write(body)
+
+    def write_error(self, status_code, **kwargs):
+        message = self._reason
+        if 'exc_info' in kwargs:
+            error = kwargs['exc_info'][1]
+            if isinstance(error, (QueryError, RuntimeError)):
+                message = str(error)
+        self.write_json(json.dumps({'error': message}).encode('utf-8'))
+
+
+class CachedQueryHandler(BaseHandler):
+    """GET endpoint whose responses are cached and support ETag/Last-Modified validation."""
+
+    endpoint = None
+
+    def get(self):
+        self.set_header('Last-Modified', format_datetime(self.service.last_modified, usegmt=True))
+        self.set_header('Cache-Control', 'public, max-age=0, must-revalidate')
+
+        if self._not_modified_since():
+            self.set_status(304)
+            return
+
+        params = self.query_params()
+        key = self.cache.key(self.endpoint, params)
+        entry = self.cache.get(key)
+        if entry is None:
+            try:
+                result = getattr(self.service, self.endpoint)(params)
+            except QueryError as e:
+                raise tornado.web.HTTPError(400, reason=str(e))
+            entry = self.cache.put(key, json.dumps(result, ensure_ascii=False).encode('utf-8'))
+
+        body, self._etag = entry
+        # RequestHandler.finish() answers 304 itself when If-None-Match matches the ETag
+        self.write_json(body)
+
+    def _not_modified_since(self):
+        header = self.request.headers.get('If-Modified-Since')
+        if not header or self.request.headers.get('If-None-Match'):
+            return False
+        try:
+            since = parsedate_to_datetime(header)
+        except (TypeError, ValueError):
+            return False
+        return since.tzinfo is not None and self.service.last_modified <= since
+
+
+class FilterHandler(CachedQueryHandler):
+    endpoint = 'filter'
+
+
+class SearchHandler(CachedQueryHandler):
+    endpoint = 'search'
+
+
+class AggregateHandler(CachedQueryHandler):
+    endpoint = 'aggregate'
+
+
+class PredictHandler(BaseHandler):
+    """POST {"titles": [...]} and receive one predicted cluster per title."""
+
+    def initialize(self, service, cache, executor):
+        super().initialize(service, cache)
+        self.executor = executor
+
+    async def post(self):
+        try:
+            titles = json.loads(self.request.body or b'{}').get('titles')
+        except (ValueError, AttributeError):
+            raise tornado.web.HTTPError(400, reason="Body must be a JSON object")
+        if not isinstance(titles, list) or not all(isinstance(t, str) for t in titles):
+            raise tornado.web.HTTPError(400, reason="'titles' must be a list of strings")
+        if len(titles) > MAX_BATCH:
+            raise tornado.web.HTTPError(400, reason=f"At most {MAX_BATCH} titles per request")
+        if self.service.model is None:
+            raise tornado.web.HTTPError(503, reason="Cluster model is not loaded")
+
+        # Keep the IOLoop responsive for other clients while the model runs
+        result = await tornado.ioloop.IOLoop.current().run_in_executor(
+            self.executor, self.service.predict, titles
+        )
+        self.write_json(json.dumps(result).encode('utf-8'))
+
+
+class StatsHandler(BaseHandler):
+
+    def get(self):
+        self.write_json(json.dumps({
+            'rows': int(len(self.service.df)),
+            'model_loaded': self.service.model is not None,
+            'last_modified': self.service.last_modified.isoformat(),
+            'cache_hits': self.cache.hits,
+            'cache_misses': self.cache.misses,
+        }).encode('utf-8'))
+
+
+def make_app(service, cache_size=1024, workers=4):
+    cache = ResponseCache(cache_size)
+    executor = ThreadPoolExecutor(max_workers=workers)
+    shared = dict(service=service, cache=cache)
+    return tornado.web.Application([
+        (r'/filter', FilterHandler, shared),
+        (r'/search', SearchHandler, shared),
+        (r'/aggregate', AggregateHandler, shared),
+        (r'/predict', PredictHandler, dict(shared, executor=executor)),
+        (r'/stats', StatsHandler, shared),
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8600)
+    parser.add_argument('--address', default='127.0.0.1')
+    parser.add_argument('--data-path', default='.')
+    parser.add_argument('--model-path', default=data_loader.MODEL_PATH)
+    parser.add_argument('--cache-size', type=int, default=1024, help="Number of cached responses")
+    parser.add_argument('--workers', type=int, default=4, help="Threads used for batch predictions")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    service = QueryService.from_path(args.data_path, args.model_path)
+    app = make_app(service, args.cache_size, args.workers)
+    app.listen(args.port, address=args.address)
+    logger.info("Serving %d rows on http://%s:%d", len(service.df), args.address, args.port)
+    tornado.ioloop.IOLoop.current().start()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""Disk-backed cache of filter, aggregate and search results that survives restarts.
+
+Each result is a Parquet file named after the hash of its normalized query and
+the dataset version, so results computed from older CSVs are never served. A
+SQLite index next to the files records sizes and access times for TTL and
+size-based eviction; SQLite locking plus atomic file renames make the cache
+safe to share between several worker processes on one host.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+CACHE_DIR = '.result_cache'
+DEFAULT_TTL = 24 * 60 * 60
+DEFAULT_MAX_BYTES = 256 * 2 ** 20
+
+
+class ResultCache:
+
+    def __init__(self, version, directory=CACHE_DIR, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        self.version = version
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                'key TEXT PRIMARY KEY, size INTEGER NOT NULL, '
+                'created REAL NOT NULL, accessed REAL NOT NULL)'
+            )
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per call keeps the cache usable from any thread
+        conn = sqlite3.connect(os.path.join(self.directory, 'index.sqlite'), timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.parquet')
+
+    def key(self, kind, query):
+        """Stable key for a query: dict key order and numpy vs Python scalars do not matter."""
+        normalized = json.dumps(
+            {'kind': kind, 'query': _normalize(query), 'version': self.version},
+            sort_keys=True, default=str,
+        )
+        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+    def get(self, kind, query):
+        """Cached DataFrame for the query, or None on a miss or expired entry."""
+        key = self.key(kind, query)
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute('SELECT created FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[0] > self.ttl:
+                self._remove(conn, [key])
+                return None
+            try:
+                result = pd.read_parquet(self._path(key))
+            except FileNotFoundError:
+                # Evicted by another process between the lookup and the read
+                conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+                return None
+            conn.execute('UPDATE entries SET accessed = ? WHERE key = ?', (now, key))
+        return result
+
+    def put(self, kind, query, result):
+        key = self.key(kind, query)
+        # Write to a temporary file first so readers never see a partial Parquet file
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        os.close(fd)
+        try:
+            result.to_parquet(tmp_path)
+            size = os.path.getsize(tmp_path)
+            now = time.time()
+            with self._connect() as conn:
+                # The write lock serializes publishing and eviction across processes
+                conn.execute('BEGIN IMMEDIATE')
+                os.replace(tmp_path, self._path(key))
+                conn.execute(
+                    'INSERT OR REPLACE INTO entries (key, size, created, accessed) VALUES (?, ?, ?, ?)',
+                    (key, size, now, now),
+                )
+                self._evict(conn, now)
+                conn.execute('COMMIT')
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def get_or_compute(self, kind, query, compute):
+        """Return the cached result for the query, computing and storing it on a miss."""
+        result = self.get(kind, query)
+        if result is None:
+            result = compute()
+            self.put(kind, query, result)
+        return result
+
+    def clear(self):
+        with self._connect() as conn:
+            keys = [row[0] for row in conn.execute('SELECT key FROM entries')]
+            self._remove(conn, keys)
+
+    def _evict(self, conn, now):
+        expired = [row[0] for row in conn.execute('SELECT key FROM entries WHERE created < ?', (now - self.ttl,))]
+        self._remove(conn, expired)
+
+        # Least recently used entries go first once the cache is over its size budget
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        victims = []
+        for key, size in conn.execute('SELECT key, size FROM entries ORDER BY accessed'):
+            if total <= self.max_bytes:
+                break
+            victims.append(key)
+            total -= size
+        self._remove(conn, victims)
+
+    def _remove(self, conn, keys):
+        for key in keys:
+            conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+
+def _normalize(value):
+    # Values are keyed exactly as the query uses them: callers sort filters whose order is irrelevant
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (set, frozenset)):
+        return sorted((_normalize(v) for v in value), key=lambda v: json.dumps(v, sort_keys=True, default=str))
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
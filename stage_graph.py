@@ -0,0 +1,96 @@
+"""Explicit dependency graph of the dashboard's computation stages.
+
+Streamlit reruns visualize.py top to bottom on every widget change. Each stage
+registered here declares its inputs (widget values set with set_input, or other
+stages) and memoizes its output keyed by the versions of those inputs. An input
+gets a new version only when its value changes, so a rerun recomputes just the
+stages downstream of the changed widget and reuses the rest. Stages are pulled
+lazily, so stages of pages that are not shown are never computed.
+
+Every run records a trace of which stages were recomputed or reused.
+"""
+import logging
+import time
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+_Memo = namedtuple('_Memo', ['key', 'version', 'value'])
+
+
+class StageGraph:
+
+    def __init__(self):
+        self._stages = {}
+        # name -> _Memo(versions of the inputs it was computed from, own version, value)
+        self._memo = {}
+        self._resolved = {}
+        self._next_version = 0
+        self.run_number = 0
+        self.trace = []
+
+    def begin_run(self):
+        """Start a rerun: inputs must be set again and stages are re-resolved on demand."""
+        self.run_number += 1
+        self._resolved = {}
+        self.trace = []
+
+    def _bump(self):
+        self._next_version += 1
+        return self._next_version
+
+    def set_input(self, name, value):
+        """Declare an external input (e.g. a widget value) for this run and return it."""
+        memo = self._memo.get(name)
+        if memo is None or not _same(memo.value, value):
+            memo = self._memo[name] = _Memo(None, self._bump(), value)
+        self._resolved[name] = memo.version
+        return value
+
+    def stage(self, name, inputs=()):
+        """Decorator registering compute(*input_values) as stage name.
+
+        Stages are re-registered on every rerun; the memoized output survives
+        as long as the versions of the inputs are unchanged, so compute must not
+        read anything that is not listed in inputs.
+        """
+        def register(compute):
+            self._stages[name] = (tuple(inputs), compute)
+            return compute
+        return register
+
+    def __getitem__(self, name):
+        if name in self._resolved:
+            return self._memo[name].value
+        if name not in self._stages:
+            raise KeyError(f"{name!r} is neither a registered stage nor an input set in this run")
+
+        inputs, compute = self._stages[name]
+        values = [self[input_name] for input_name in inputs]
+        key = tuple(self._resolved[input_name] for input_name in inputs)
+
+        start = time.perf_counter()
+        memo = self._memo.get(name)
+        if memo is not None and memo.key == key:
+            status = 'reused'
+        else:
+            memo = self._memo[name] = _Memo(key, self._bump(), compute(*values))
+            status = 'recomputed'
+        elapsed = (time.perf_counter() - start) * 1000
+
+        self._resolved[name] = memo.version
+        self.trace.append({'stage': name, 'status': status, 'ms': round(elapsed, 1), 'inputs': ', '.join(inputs)})
+        logger.debug("run %d: %s %s (%.1f ms)", self.run_number, name, status, elapsed)
+        return memo.value
+
+    def recomputed(self):
+        """Names of the stages recomputed in the current run."""
+        return [entry['stage'] for entry in self.trace if entry['status'] == 'recomputed']
+
+
+def _same(a, b):
+    # DataFrames and arrays do not compare to a single bool; fall back to identity for them
+    try:
+        return type(a) is type(b) and bool(a == b)
+    except (TypeError, ValueError):
+        return a is b
@@ -4,6 +4,7 @@ import streamlit as st
 import pydeck as pdk
 import plotly.express as px
 import plotly.graph_objs as go
+import country_codes
 
 # Function to load datasets for multiple years
 def load_combined_dataset():
@@ -35,6 +36,9 @@ def load_combined_dataset():
         for col in columns_to_fill:
             combined_df[col] = combined_df[col].fillna('Unknown')
 
+        # Resolve country names to ISO-3 codes once, at load time
+        combined_df['iso3'] = country_codes.to_iso3(combined_df['country'])
+
         return combined_df
     else:
         st.error("No data files could be loaded!")
@@ -97,17 +101,19 @@ if page == "Cluster Analysis":
     st.plotly_chart(fig)
 
 elif page == "Geographic Analysis":
-    country_counts = filtered_df['country'].value_counts().reset_index()
-    country_counts.columns = ['Country', 'Publications']
+    country_counts = country_codes.country_counts(filtered_df)
+    country_counts = country_counts.rename(columns={'country': 'Country', 'publication_count': 'Publications'})
     st.markdown("## 🌐 Research Publications by Country")
     fig = px.choropleth(
         country_counts,
-        locations='Country',
-        locationmode='country names',
+        geojson=country_codes.load_geojson(),
+        locations='iso3',
+        featureidkey='id',
         color='Publications',
         hover_name='Country',
         title="Global Distribution of Research Publications"
     )
+    fig.update_geos(visible=False, projection_type='natural earth', lataxis_range=[-60, 90])
     st.plotly_chart(fig)
 
 elif page == "Author and Affiliation Insights":
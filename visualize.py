@@ -1,11 +1,22 @@
-import os
+import sys
+import datetime
+import numpy as np
 import pandas as pd
 import streamlit as st
 import pydeck as pdk
 import plotly.express as px
 import plotly.graph_objs as go
-import joblib
 from sklearn.feature_extraction.text import TfidfVectorizer
+import data_loader
+import country_codes
+from collaboration import build_collaboration_graph, build_yearly_graphs
+from cluster_profiles import load_profiles, profiles_version
+from result_cache import ResultCache
+from bitmap_index import BitmapIndex
+from date_index import DateIndex
+from dataset_scanner import DatasetScanner, filter_expression
+from stage_graph import StageGraph
+from spatial_index import SpatialIndex
 
 st.set_page_config(
     page_title="10 Year Academic Insights",
@@ -13,44 +24,82 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
+# streamlit run visualize.py -- --out-of-core serves the pages from streaming scans of the Parquet dataset
+OUT_OF_CORE = '--out-of-core' in sys.argv[1:]
+TABLE_PAGE_SIZE = 50
+
 # Load external CSS
 def load_css(file_path="assets/directory/styles.css"):
     with open(file_path, "r") as f:
         st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
 
-@st.cache_resource        
+@st.cache_resource
 def load_model():
-    return joblib.load('model_with_stopwords_removed_without_thousand_again.joblib')
+    return data_loader.load_model()
 
 model = load_model()
 
 # Load datasets function
 def load_combined_dataset(base_path='.'):
     """Load and merge CSV files for multiple years."""
-    pattern = 'cluster_final_prepared_{}_data.csv'
-    dataframes = []
-
-    for year in range(2013, 2024):
-        filepath = os.path.join(base_path, pattern.format(year))
-        if os.path.exists(filepath):
-            try:
-                df = pd.read_csv(filepath)
-                df['year'] = year
-                dataframes.append(df)
-            except Exception as e:
-                st.sidebar.warning(f"Error loading {filepath}: {e}")
-    
-    if dataframes:
-        combined_df = pd.concat(dataframes, ignore_index=True)
-        combined_df['publication_date'] = pd.to_datetime(combined_df['publication_date'], errors='coerce')
-        combined_df = combined_df.dropna(subset=['publication_date'])
-        columns_to_fill = ['title', 'author_name', 'affiliation', 'city', 'country']
-        for col in columns_to_fill:
-            combined_df[col] = combined_df[col].fillna('Unknown')
-        return combined_df
-    else:
+    combined_df = data_loader.load_combined_dataset(
+        base_path,
+        on_error=lambda filepath, e: st.sidebar.warning(f"Error loading {filepath}: {e}")
+    )
+    if combined_df.empty:
         st.error("No data files could be loaded!")
-        return pd.DataFrame()
+    return combined_df
+
+@st.cache_resource
+def load_dataset(version):
+    """Combined dataset with year and cluster colors, loaded once per dataset version and shared by all sessions."""
+    df = get_result_cache(version).get_or_compute('dataset', {}, load_combined_dataset)
+    df["year"] = df["publication_date"].dt.year
+    # Map the color for each row based on its cluster (once per dataset, not on every rerun)
+    df["color"] = df["cluster"].map(color_map)
+    return df
+
+@st.cache_resource
+def load_collaboration_graphs(_df, version):
+    """Per-year author and affiliation collaboration graphs, built once per dataset version."""
+    return {
+        'Authors': build_yearly_graphs(_df, 'author_name'),
+        'Affiliations': build_yearly_graphs(_df, 'affiliation'),
+    }
+
+@st.cache_resource
+def load_cluster_profiles(version):
+    """Precomputed cluster profiles (built offline by cluster_profiles.py), reloaded when the file changes."""
+    return load_profiles()
+
+@st.cache_resource
+def get_result_cache(version):
+    """On-disk result cache shared by all sessions and worker processes, keyed by dataset version."""
+    return ResultCache(version)
+
+@st.cache_resource
+def load_bitmap_index(_df, version):
+    """Per-value bitmaps for year, country, city and cluster, built once per dataset version."""
+    return BitmapIndex(_df)
+
+@st.cache_resource
+def load_date_index(_df, version):
+    """Date-sorted rows and prefix-sum counts per day/month/quarter, built once per dataset version."""
+    return DateIndex(_df)
+
+@st.cache_resource
+def load_spatial_index(_df, version):
+    """BallTree (haversine) over publication and institution coordinates, built once per dataset version."""
+    return SpatialIndex(_df)
+
+@st.cache_resource
+def load_scanner():
+    """Streaming scanner over the year-partitioned Parquet dataset (built by dataset_scanner.py convert)."""
+    return DatasetScanner()
+
+@st.cache_resource
+def load_date_bounds(_scanner, version):
+    return _scanner.date_bounds()
 
 def rgba_to_plotly(rgba):
     return f'rgba({rgba[0]},{rgba[1]},{rgba[2]},{rgba[3]/255})'
@@ -59,7 +108,17 @@ def rgba_to_plotly(rgba):
 load_css()
 
 ## Main Dashboard
-df = load_combined_dataset()
+if OUT_OF_CORE:
+    # Nothing is loaded up front: every page scans the Parquet dataset in bounded batches
+    scanner = load_scanner()
+    result_cache = get_result_cache(scanner.version())
+else:
+    # Per-session stage graph: a rerun recomputes only the stages downstream of the widgets that changed
+    stages = st.session_state.setdefault('stage_graph', StageGraph())
+    stages.begin_run()
+    result_cache = get_result_cache(stages.set_input('dataset_version', data_loader.dataset_version()))
+
+    stages.stage('dataset', inputs=['dataset_version'])(load_dataset)
 
 
 # Streamlit App Title
@@ -110,121 +169,411 @@ color_map = {
 st.sidebar.markdown("## 🧭 Navigation")
 page = st.sidebar.radio("Select Analysis View", ["Cluster Analysis", "Geographic Analysis", "Author and Affiliation Insights", "Topic/Keyword Filter"])
 
-# Sidebar Filters for Year
-st.sidebar.markdown("## 🔍 Filters")
-selected_year = st.sidebar.slider("Select Year", int(df['year'].min()), int(df['year'].max()), 2017)
+def out_of_core_dashboard(scanner, page):
+    """Pages served by streaming scans of the Parquet dataset instead of an in-memory DataFrame.
+
+    Filters become dataset expressions, charts are built from per-group totals
+    and the table materializes only the visible page of rows.
+    """
+    st.sidebar.markdown("## 🔍 Filters")
+    filter_mode = st.sidebar.radio("Filter by", ["Year", "Date Range"], horizontal=True)
+    if filter_mode == "Year":
+        years = scanner.years()
+        selected_year = st.sidebar.slider("Select Year", years[0], years[-1], min(max(2017, years[0]), years[-1]))
+        selection = {'year': selected_year}
+        selection_label = str(selected_year)
+    else:
+        min_date, max_date = load_date_bounds(scanner, scanner.version())
+        date_from, date_to = st.sidebar.slider(
+            "Publication Date Range",
+            min_value=min_date,
+            max_value=max_date,
+            value=(min_date, max_date)
+        )
+        selection = {'date_from': date_from.isoformat(), 'date_to': date_to.isoformat()}
+        selection_label = f"{date_from:%d %b %Y} - {date_to:%d %b %Y}"
+
+    # Scans are cached on disk like the in-memory aggregates, keyed by the selection and extra filters
+    def scan_count(**query):
+        return int(result_cache.get_or_compute(
+            'aggregate', {'by': None, **selection, **query},
+            lambda: pd.DataFrame({'count': [scanner.count(filter_expression(**selection, **query))]})
+        )['count'].iloc[0])
+
+    def scan_totals(by, top=None, mean_columns=(), **query):
+        return result_cache.get_or_compute(
+            'aggregate', {'by': by, 'top': top, 'means': list(mean_columns), **selection, **query},
+            lambda: scanner.group_totals(by, filter_expression(**selection, **query), mean_columns)
+                           .head(top).reset_index()
+        )
 
-# Prepare the data (year)
-df["year"] = pd.to_datetime(df["publication_date"]).dt.year
-filtered_df = df[df["year"] == selected_year]
+    total = scan_count()
+    st.sidebar.caption(f"{total:,} publications in range (out-of-core mode)")
+    if not total:
+        st.warning(f"No publications found for {selection_label}. Try a wider range.")
+        st.stop()
 
-# Conditional (Select Country + Select City)
-if page == "Geographic Analysis":
-    # Country Selection
-    country_options = sorted(df['country'].unique())
-    selected_country = st.sidebar.selectbox("Select Country", options=["All"] + list(country_options))
-    
-    # City Selection
-    if selected_country == "All":
-        city_options = sorted(df['city'].unique())
+    chart_layout = dict(
+        plot_bgcolor="#f4f4f4",
+        paper_bgcolor="#f4f4f4",
+        font=dict(family="Arial", size=12, color="#2c3e50"),
+        margin=dict(t=20, b=40)
+    )
+
+    if page == "Cluster Analysis":
+        st.markdown("## 📊 Cluster Composition")
+        cluster_counts = scan_totals('cluster')
+        fig = go.Figure(data=[
+            go.Bar(
+                x=cluster_counts['cluster'],
+                y=cluster_counts['count'],
+                marker_color=[
+                    rgba_to_plotly(color_map.get(cluster, [128, 128, 128, 160]))
+                    for cluster in cluster_counts['cluster']
+                ],
+                hovertemplate='<b>Cluster: %{x}</b><br>Number of Points: %{y}<br><extra></extra>',
+                opacity=0.85
+            )
+        ])
+        fig.update_layout(xaxis_title='Cluster ID', yaxis_title='Number of Points in Cluster', **chart_layout)
+        st.plotly_chart(fig, use_container_width=True)
+
+    elif page == "Geographic Analysis":
+        country_options = sorted(scan_totals('country')['country'])
+        selected_country = st.sidebar.selectbox("Select Country", options=["All"] + country_options)
+        place = {} if selected_country == "All" else {'countries': [selected_country]}
+
+        # One weighted point per city instead of one point per paper; same-named cities in
+        # different countries stay apart and papers without a known city are left out
+        st.markdown("## 🌡️ Research Heatmap")
+        city_points = scan_totals(['country', 'city'], mean_columns=('latitude', 'longitude'), **place)
+        city_points = city_points[city_points['city'] != 'Unknown'].dropna()
+        place_label = f"{selected_country}, {selection_label}" if place else selection_label
+        if city_points.empty:
+            st.warning(f"No geographic data available for {place_label}")
+        else:
+            st.pydeck_chart(pdk.Deck(
+                map_style="mapbox://styles/mapbox/light-v9",
+                initial_view_state=pdk.ViewState(
+                    latitude=city_points['latitude'].mean(),
+                    longitude=city_points['longitude'].mean(),
+                    zoom=3 if place else 1,
+                    pitch=50,
+                ),
+                layers=[
+                    pdk.Layer(
+                        "HeatmapLayer",
+                        data=city_points,
+                        get_position="[longitude, latitude]",
+                        get_weight="count",
+                        radius_pixels=30,
+                        opacity=0.7,
+                    ),
+                ],
+            ))
+
+        st.markdown("## 🌐 Top Research Countries")
+        country_counts = scan_totals('iso3', mean_columns=('latitude', 'longitude'))
+        fig = px.choropleth(
+            country_counts,
+            geojson=country_codes.load_geojson(),
+            locations='iso3',
+            featureidkey='id',
+            color='count',
+            color_continuous_scale='Viridis',
+            labels={'count': 'Publications'}
+        )
+        fig.update_geos(visible=False, showcountries=False, projection_type='natural earth', lataxis_range=[-60, 90])
+        fig.update_layout(height=500, **chart_layout)
+        st.plotly_chart(fig, use_container_width=True)
+
+        st.markdown("## 🏙️ City-Level Analysis")
+        city_table = city_points[['city', 'country', 'count']].head(20)
+        city_table.columns = ['City', 'Country', 'Number of Publications']
+        st.dataframe(city_table, use_container_width=True, hide_index=True)
+
+    elif page == "Author and Affiliation Insights":
+        st.header("Author and Affiliation Insights")
+        st.markdown("## 🏆 Top 10 Authors by Publications")
+        top_authors = scan_totals('author_name', top=10)
+        fig_authors = px.bar(
+            top_authors,
+            x='author_name',
+            y='count',
+            color='count',
+            color_continuous_scale='Blues',
+            labels={'author_name': 'Author', 'count': 'Number of Publications'}
+        )
+        fig_authors.update_layout(**chart_layout)
+        st.plotly_chart(fig_authors, use_container_width=True)
+
+        st.markdown("## 🏫 Top 10 Affiliations by Publications")
+        top_affiliations = scan_totals('affiliation', top=10)
+        fig_affiliations = px.pie(
+            top_affiliations,
+            names='affiliation',
+            values='count',
+            color_discrete_sequence=px.colors.sequential.RdBu
+        )
+        fig_affiliations.update_layout(**chart_layout)
+        st.plotly_chart(fig_affiliations, use_container_width=True)
+
+    elif page == "Topic/Keyword Filter":
+        st.markdown("<h2 style='text-align: center; color: #34495e;'>🔍 Topic/Keyword Filter</h2>", unsafe_allow_html=True)
+        col1, col2 = st.columns([3, 2])
+        with col1:
+            keyword = st.text_input(
+                "Enter research topic or keyword:",
+                placeholder="e.g., Artificial Intelligence, Machine Learning",
+                help="Search across titles, affiliations, and cities"
+            ).strip()
+        with col2:
+            countries = st.multiselect("Filter by Countries", options=sorted(scan_totals('country')['country']))
+
+        query = {'keyword': keyword or None, 'countries': sorted(countries) or None}
+        matches = scan_count(**query)
+        st.caption(f"{matches:,} matching publications")
+        if not matches:
+            st.warning(f"No research papers found for '{keyword}'")
+            return
+
+        # Only the rows of the visible page are read into memory
+        n_pages = (matches - 1) // TABLE_PAGE_SIZE + 1
+        table_page = st.number_input(f"Page (of {n_pages})", min_value=1, max_value=n_pages, value=1)
+        rows = scanner.page(
+            filter_expression(**selection, **query),
+            offset=(table_page - 1) * TABLE_PAGE_SIZE,
+            limit=TABLE_PAGE_SIZE,
+            columns=['author_name', 'affiliation', 'title', 'publication_date', 'country', 'cluster']
+        )
+        st.dataframe(rows, use_container_width=True, hide_index=True)
+
+        if keyword:
+            st.info(f"Predicted cluster for '{keyword}': {model.predict([keyword])[0]}")
+
+
+if OUT_OF_CORE:
+    out_of_core_dashboard(scanner, page)
+    st.stop()
+
+# Sidebar Filters for Year or Publication Date Range
+df = stages['dataset']
+st.sidebar.markdown("## 🔍 Filters")
+filter_mode = st.sidebar.radio("Filter by", ["Year", "Date Range"], horizontal=True)
+date_index = load_date_index(df, data_loader.dataset_version())
+
+if filter_mode == "Year":
+    selected_year = st.sidebar.slider("Select Year", int(df['year'].min()), int(df['year'].max()), 2017)
+    granularity = 'day'
+    date_from, date_to = datetime.date(selected_year, 1, 1), datetime.date(selected_year, 12, 31)
+    selection_label = str(selected_year)
+else:
+    granularity = st.sidebar.selectbox("Granularity", ["Day", "Month", "Quarter"]).lower()
+    periods = date_index.periods(granularity)
+    if granularity == 'day':
+        date_from, date_to = st.sidebar.slider(
+            "Publication Date Range",
+            min_value=periods[0],
+            max_value=periods[-1],
+            value=(periods[0], periods[-1])
+        )
     else:
-        city_options = sorted(df[df['country'] == selected_country]['city'].unique())
-    
-    selected_city = st.sidebar.selectbox("Select City", options=["All"] + list(city_options))
+        labels = {
+            (p.strftime('%b %Y') if granularity == 'month' else f"Q{(p.month - 1) // 3 + 1} {p.year}"): p
+            for p in periods
+        }
+        label_from, label_to = st.sidebar.select_slider(
+            "Publication Date Range",
+            options=list(labels),
+            value=(next(iter(labels)), list(labels)[-1])
+        )
+        date_from, date_to = labels[label_from], date_index.period_end(labels[label_to], granularity)
+    selection_label = f"{date_from:%d %b %Y} - {date_to:%d %b %Y}"
+    # O(1) range count from the prefix sums
+    st.sidebar.caption(f"{date_index.count(date_from, date_to, granularity):,} publications in range")
+
+# Prepare the data (year or date range)
+bitmap_index = load_bitmap_index(df, data_loader.dataset_version())
+if filter_mode == "Year":
+    selection = stages.set_input('selection', {'year': selected_year})
 else:
-    # For other page, we don't show the country or city filters
-    selected_country = "All"
-    selected_city = "All"
+    selection = stages.set_input('selection', {'date_from': date_from.isoformat(), 'date_to': date_to.isoformat()})
+stages.set_input('date_range', (date_from, date_to, granularity))
+
+@stages.stage('year_filter', inputs=['dataset', 'selection'])
+def year_filter(df, selection):
+    """Row positions, bitset and rows of the selected year or date range."""
+    if 'year' in selection:
+        selection_bits = bitmap_index.mask('year', [selection['year']])
+        selection_rows = bitmap_index.rows(selection_bits)
+    else:
+        # Contiguous slice of the date-sorted index
+        selection_rows = date_index.rows(selection['date_from'], selection['date_to'])
+        selection_mask = np.zeros(bitmap_index.n_rows, dtype=bool)
+        selection_mask[selection_rows] = True
+        selection_bits = bitmap_index.from_mask(selection_mask)
+    return selection_rows, selection_bits, df.iloc[selection_rows]
+
+selection_rows, selection_bits, filtered_df = stages['year_filter']
+if filtered_df.empty:
+    st.warning(f"No publications found for {selection_label}. Try a wider range.")
+    st.stop()
+collaboration_graphs = load_collaboration_graphs(df, data_loader.dataset_version())
+
+# Conditional (Select Country + Select City, or a distance around a city)
+spatial_index = load_spatial_index(df, data_loader.dataset_version())
+location_mode = "Country/City"
+if page == "Geographic Analysis":
+    location_mode = st.sidebar.radio("Locate by", ["Country/City", "Distance"], horizontal=True)
 
-# Map the color for each row based on its cluster
-filtered_df["color"] = filtered_df["cluster"].map(color_map)
+if location_mode == "Country/City":
+    if page == "Geographic Analysis":
+        # Country Selection
+        country_options = sorted(df['country'].unique())
+        selected_country = st.sidebar.selectbox("Select Country", options=["All"] + list(country_options))
+
+        # City Selection
+        if selected_country == "All":
+            city_options = sorted(df['city'].unique())
+        else:
+            city_options = sorted(df[df['country'] == selected_country]['city'].unique())
+
+        selected_city = st.sidebar.selectbox("Select City", options=["All"] + list(city_options))
+    else:
+        # For other page, we don't show the country or city filters
+        selected_country = "All"
+        selected_city = "All"
+    location_label = f"{selected_city} in {selected_country}"
+    geo_selection = {'country': selected_country, 'city': selected_city}
+else:
+    # Radius around a city, whatever the spelling of the city names inside it
+    place_labels = (spatial_index.places['city'] + ", " + spatial_index.places['country']).tolist()
+    selected_place = st.sidebar.selectbox("Center City", options=place_labels)
+    radius_km = st.sidebar.slider("Radius (km)", min_value=5, max_value=500, value=50, step=5)
+    center = spatial_index.places.iloc[place_labels.index(selected_place)]
+    selected_country, selected_city = center['country'], center['city']
+    location_label = f"{radius_km} km of {selected_place}"
+    geo_selection = {'latitude': center['latitude'], 'longitude': center['longitude'], 'radius_km': radius_km}
+stages.set_input('geo_selection', geo_selection)
+
+@stages.stage('geo_filter', inputs=['dataset', 'year_filter', 'geo_selection'])
+def geo_filter(df, year_filter, geo_selection):
+    """Heatmap points and table rows of the selected period narrowed to the selected place."""
+    if 'radius_km' in geo_selection:
+        rows, distances = spatial_index.within_radius(
+            geo_selection['latitude'], geo_selection['longitude'], geo_selection['radius_km']
+        )
+        # Keep the rows of the selected period (AND with its bitset), nearest first
+        radius_bits = bitmap_index.from_mask(spatial_index.mask(rows))
+        period_rows = bitmap_index.rows(bitmap_index.intersect(year_filter[1], radius_bits))
+        distance_km = pd.Series(distances, index=rows).loc[period_rows].to_numpy()
+        geo_df = df.iloc[period_rows].assign(distance_km=distance_km).sort_values('distance_km', kind='stable')
+    else:
+        geo_df = year_filter[2]
+        if geo_selection['country'] != "All":
+            geo_df = geo_df[geo_df['country'] == geo_selection['country']]
+            if geo_selection['city'] != "All":
+                geo_df = geo_df[geo_df['city'] == geo_selection['city']]
+    return geo_df.dropna(subset=['latitude', 'longitude']), geo_df.reset_index(drop=True)
 
 
 
 # Handle different pages in the app
 if page == "Cluster Analysis":
+    @stages.stage('cluster_map', inputs=['year_filter'])
+    def cluster_map(year_filter):
+        filtered_df = year_filter[2]
+        return pdk.Deck(
+            map_style="mapbox://styles/mapbox/light-v9",  # Light theme
+            initial_view_state=pdk.ViewState(
+                latitude=filtered_df["latitude"].mean(),
+                longitude=filtered_df["longitude"].mean(),
+                zoom=1,
+                pitch=4,
+            ),
+            layers=[
+                pdk.Layer(
+                    "ScatterplotLayer",
+                    data=filtered_df,
+                    get_position="[longitude, latitude]",
+                    get_fill_color="color",
+                    get_radius=65000,
+                    pickable=True,
+                    opacity=0.7,
+                ),
+            ],
+        )
+
     # Clustered Geomap
     st.markdown("## 🌍 Clustered Geomap")
     col1, col2, col3 = st.columns([0.5, 4, 0.5])  # Adjust middle column width
     with col2:
-        st.pydeck_chart(pdk.Deck(
-        # Your existing pydeck configuration
-        map_style="mapbox://styles/mapbox/light-v9",  # Light theme
-        initial_view_state=pdk.ViewState(
-            latitude=filtered_df["latitude"].mean(),
-            longitude=filtered_df["longitude"].mean(),
-            zoom=1,
-            pitch=4,
-        ),
-        layers=[
-            pdk.Layer(
-                "ScatterplotLayer",
-                data=filtered_df,
-                get_position="[longitude, latitude]",
-                get_fill_color="color",
-                get_radius=65000,
-                pickable=True,
-                opacity=0.7,
-            ),
-        ],
-    ))
+        st.pydeck_chart(stages['cluster_map'])
 
     # Cluster Composition Bar Chart
     st.markdown("## 📊 Cluster Composition")
 
-    cluster_counts = filtered_df['cluster'].value_counts().reset_index()
-    cluster_counts.columns = ['Cluster', 'Number of Points']
-
-    # Bar chart data
-    fig = go.Figure(data=[
-        go.Bar(
-            x=cluster_counts['Cluster'],
-            y=cluster_counts['Number of Points'],
-            marker_color=[
-                rgba_to_plotly(color_map.get(cluster, [128, 128, 128, 160])) 
-                for cluster in cluster_counts['Cluster']
-            ],
-            hovertemplate='<b>Cluster: %{x}</b><br>Number of Points: %{y}<br><extra></extra>',
-            opacity=0.85
+    @stages.stage('cluster_counts', inputs=['dataset', 'date_range'])
+    def cluster_counts(df, date_range):
+        cluster_counts = date_index.facet_counts('cluster', *date_range).reset_index()
+        cluster_counts.columns = ['Cluster', 'Number of Points']
+        return cluster_counts
+
+    @stages.stage('cluster_figure', inputs=['cluster_counts'])
+    def cluster_figure(cluster_counts):
+        # Bar chart data
+        fig = go.Figure(data=[
+            go.Bar(
+                x=cluster_counts['Cluster'],
+                y=cluster_counts['Number of Points'],
+                marker_color=[
+                    rgba_to_plotly(color_map.get(cluster, [128, 128, 128, 160])) 
+                    for cluster in cluster_counts['Cluster']
+                ],
+                hovertemplate='<b>Cluster: %{x}</b><br>Number of Points: %{y}<br><extra></extra>',
+                opacity=0.85
+            )
+        ])
+
+        # Layout update
+        fig.update_layout(
+            xaxis=dict(
+                title='Cluster ID',
+                titlefont=dict(size=14, color="#2c3e50"),
+                tickfont=dict(size=12, color="#34495e"),
+                gridcolor="rgba(200,200,200,0.2)",  # Light gridlines
+                zeroline=False
+            ),
+            yaxis=dict(
+                title='Number of Points in Cluster',
+                titlefont=dict(size=14, color="#2c3e50"),
+                tickfont=dict(size=12, color="#34495e"),
+                gridcolor="rgba(200,200,200,0.3)",  # Slightly darker gridlines
+                zeroline=False
+            ),
+            plot_bgcolor="#f4f4f4",  # Background color close to specified
+            paper_bgcolor="#f4f4f4",  # Full chart background
+            font=dict(family="Arial", size=12, color="#2c3e50"),
+            margin=dict(t=20, b=40)  # Adjust top and bottom margins
         )
-    ])
-
-    # Layout update
-    fig.update_layout(
-        xaxis=dict(
-            title='Cluster ID',
-            titlefont=dict(size=14, color="#2c3e50"),
-            tickfont=dict(size=12, color="#34495e"),
-            gridcolor="rgba(200,200,200,0.2)",  # Light gridlines
-            zeroline=False
-        ),
-        yaxis=dict(
-            title='Number of Points in Cluster',
-            titlefont=dict(size=14, color="#2c3e50"),
-            tickfont=dict(size=12, color="#34495e"),
-            gridcolor="rgba(200,200,200,0.3)",  # Slightly darker gridlines
-            zeroline=False
-        ),
-        plot_bgcolor="#f4f4f4",  # Background color close to specified
-        paper_bgcolor="#f4f4f4",  # Full chart background
-        font=dict(family="Arial", size=12, color="#2c3e50"),
-        margin=dict(t=20, b=40)  # Adjust top and bottom margins
-    )
 
-    # Add annotation for the maximum cluster
-    max_cluster = cluster_counts.loc[cluster_counts['Number of Points'].idxmax()]
-    fig.add_annotation(
-        x=max_cluster['Cluster'],
-        y=max_cluster['Number of Points'],
-        text=f"Max: {max_cluster['Number of Points']}",
-        showarrow=True,
-        arrowhead=2,
-        font=dict(size=12, color="#ffffff"),
-        bordercolor="#3498db",
-        borderwidth=2,
-        borderpad=4,
-        bgcolor="#3498db",  # Blue background for annotation
-    )
+        # Add annotation for the maximum cluster
+        max_cluster = cluster_counts.loc[cluster_counts['Number of Points'].idxmax()]
+        fig.add_annotation(
+            x=max_cluster['Cluster'],
+            y=max_cluster['Number of Points'],
+            text=f"Max: {max_cluster['Number of Points']}",
+            showarrow=True,
+            arrowhead=2,
+            font=dict(size=12, color="#ffffff"),
+            bordercolor="#3498db",
+            borderwidth=2,
+            borderpad=4,
+            bgcolor="#3498db",  # Blue background for annotation
+        )
+        return fig
+
+    fig = stages['cluster_figure']
 
     # Create columns for layout
     col1, col2, col3 = st.columns([0.5, 4, 0.5])  # Middle column is wider
@@ -238,22 +587,8 @@ if page == "Cluster Analysis":
 
 
 elif page == "Geographic Analysis":
-    # Filtering logic for data display
-    if selected_country == "All":
-        city_data = df.dropna(subset=['latitude', 'longitude'])
-    else:
-        # Filter by country first
-        country_filtered_data = df[df['country'] == selected_country]
-        
-        # Further filter by city if not "All"
-        if selected_city == "All":
-            city_data = country_filtered_data.dropna(subset=['latitude', 'longitude'])
-        else:
-            city_data = country_filtered_data[
-                (country_filtered_data['city'] == selected_city) & 
-                country_filtered_data['latitude'].notna() & 
-                country_filtered_data['longitude'].notna()
-            ]
+    # Period rows narrowed to the selected country and city (recomputed only when those change)
+    heatmap_data, table_data = stages['geo_filter']
 
     # Research Heatmap
     st.markdown("## 🗺️ Research Heatmap")
@@ -261,27 +596,9 @@ elif page == "Geographic Analysis":
     col1, col2, col3 = st.columns([0.5, 4, 0.5])  # Middle column is wider
 
     with col2:
-        
-        # Use the full dataset for the heatmap, not filtered by the selected year
-        if selected_country == "All":
-            heatmap_data = filtered_df.dropna(subset=['latitude', 'longitude'])
-        else:
-            # Filter by country
-            country_filtered_data = filtered_df[filtered_df['country'] == selected_country]
-
-            # Further filter by city if not "All"
-            if selected_city == "All":
-                heatmap_data = country_filtered_data.dropna(subset=['latitude', 'longitude'])
-            else:
-                heatmap_data = country_filtered_data[
-                    (country_filtered_data['city'] == selected_city) & 
-                    country_filtered_data['latitude'].notna() & 
-                    country_filtered_data['longitude'].notna()
-                ]
-
         # Check if there's data to plot
         if heatmap_data.empty:
-            st.warning(f"No geographic data available for {selected_city} in {selected_country}")
+            st.warning(f"No geographic data available for {location_label}")
         else:
             st.pydeck_chart(pdk.Deck(
                 map_style="mapbox://styles/mapbox/light-v9", 
@@ -307,68 +624,76 @@ elif page == "Geographic Analysis":
     st.markdown("## 🌐 Top Research Countries")
 
     # Prepare the data for the bar chart
-    country_counts = filtered_df['country'].value_counts().reset_index()
-    country_counts.columns = ['Country', 'Number of Publications']
-
-    # Create the bar chart
-    fig = go.Figure(data=[
-        go.Bar(
-            x=country_counts['Country'],
-            y=country_counts['Number of Publications'],
-            marker=dict(
-                color=country_counts['Number of Publications'],  # Use 'Number of Publications' for color scale
-                colorscale='Viridis',  # You can use any Plotly colorscale like 'Viridis', 'Cividis', etc.
-                showscale=True  # This shows a color scale bar
+    @stages.stage('country_counts', inputs=['dataset', 'date_range'])
+    def country_counts(df, date_range):
+        country_counts = date_index.facet_counts('country', *date_range).reset_index()
+        country_counts.columns = ['Country', 'Number of Publications']
+        return country_counts
+
+    @stages.stage('country_figure', inputs=['country_counts'])
+    def country_figure(country_counts):
+        # Create the bar chart
+        fig = go.Figure(data=[
+            go.Bar(
+                x=country_counts['Country'],
+                y=country_counts['Number of Publications'],
+                marker=dict(
+                    color=country_counts['Number of Publications'],  # Use 'Number of Publications' for color scale
+                    colorscale='Viridis',  # You can use any Plotly colorscale like 'Viridis', 'Cividis', etc.
+                    showscale=True  # This shows a color scale bar
+                ),
+                hovertemplate='<b>Country: %{x}</b><br>Number of Publications: %{y}<br><extra></extra>',
+                opacity=0.85
+            )
+        ])
+
+        # Layout update (similar to Cluster Composition)
+        fig.update_layout(
+            title={
+                "text": "",
+                "y": 0.95,  # Vertical alignment
+                "x": 0.5,   # Horizontal alignment (centered)
+                "xanchor": "center",
+                "yanchor": "top",
+                "font": {"size": 20, "color": "#34495e"}  # Title font color and size
+            },
+            xaxis=dict(
+                title='Country',
+                titlefont=dict(size=14, color="#2c3e50"),
+                tickfont=dict(size=12, color="#34495e"),
+                gridcolor="rgba(200,200,200,0.2)",  # Light gridlines
+                zeroline=False
             ),
-            hovertemplate='<b>Country: %{x}</b><br>Number of Publications: %{y}<br><extra></extra>',
-            opacity=0.85
+            yaxis=dict(
+                title='Number of Publications',
+                titlefont=dict(size=14, color="#2c3e50"),
+                tickfont=dict(size=12, color="#34495e"),
+                gridcolor="rgba(200,200,200,0.3)",  # Slightly darker gridlines
+                zeroline=False
+            ),
+            plot_bgcolor="#f4f4f4",  # Background color to match app background
+            paper_bgcolor="#f4f4f4",  # Full chart background color
+            font=dict(family="Arial", size=12, color="#2c3e50"),
+            margin=dict(t=20, b=40)  # Adjust margins
         )
-    ])
-
-    # Layout update (similar to Cluster Composition)
-    fig.update_layout(
-        title={
-            "text": "",
-            "y": 0.95,  # Vertical alignment
-            "x": 0.5,   # Horizontal alignment (centered)
-            "xanchor": "center",
-            "yanchor": "top",
-            "font": {"size": 20, "color": "#34495e"}  # Title font color and size
-        },
-        xaxis=dict(
-            title='Country',
-            titlefont=dict(size=14, color="#2c3e50"),
-            tickfont=dict(size=12, color="#34495e"),
-            gridcolor="rgba(200,200,200,0.2)",  # Light gridlines
-            zeroline=False
-        ),
-        yaxis=dict(
-            title='Number of Publications',
-            titlefont=dict(size=14, color="#2c3e50"),
-            tickfont=dict(size=12, color="#34495e"),
-            gridcolor="rgba(200,200,200,0.3)",  # Slightly darker gridlines
-            zeroline=False
-        ),
-        plot_bgcolor="#f4f4f4",  # Background color to match app background
-        paper_bgcolor="#f4f4f4",  # Full chart background color
-        font=dict(family="Arial", size=12, color="#2c3e50"),
-        margin=dict(t=20, b=40)  # Adjust margins
-    )
 
-    # Add annotation for the maximum country
-    max_country = country_counts.loc[country_counts['Number of Publications'].idxmax()]
-    fig.add_annotation(
-        x=max_country['Country'],
-        y=max_country['Number of Publications'],
-        text=f"Max: {max_country['Number of Publications']}",
-        showarrow=True,
-        arrowhead=2,
-        font=dict(size=12, color="#ffffff"),
-        bordercolor="#3498db",  # Blue border for annotation
-        borderwidth=2,
-        borderpad=4,
-        bgcolor="#3498db",  # Blue background for annotation
-    )
+        # Add annotation for the maximum country
+        max_country = country_counts.loc[country_counts['Number of Publications'].idxmax()]
+        fig.add_annotation(
+            x=max_country['Country'],
+            y=max_country['Number of Publications'],
+            text=f"Max: {max_country['Number of Publications']}",
+            showarrow=True,
+            arrowhead=2,
+            font=dict(size=12, color="#ffffff"),
+            bordercolor="#3498db",  # Blue border for annotation
+            borderwidth=2,
+            borderpad=4,
+            bgcolor="#3498db",  # Blue background for annotation
+        )
+        return fig
+
+    fig = stages['country_figure']
 
     # Create columns for layout
     col1, col2, col3 = st.columns([0.5, 4, 0.5])  # Middle column is wider
@@ -381,20 +706,16 @@ elif page == "Geographic Analysis":
 
     # City-Level Analysis (Table)
     st.markdown("## 📍 City-Level Analysis")
-    if selected_country == "All":
+    if location_mode == "Country/City" and selected_country == "All":
         st.info("Please select a specific country to view city-level details.")
     else:
-        # Filter table data based on country and city selection
-        if selected_city == "All":
-            table_data = filtered_df[filtered_df['country'] == selected_country]
-        else:
-            table_data = filtered_df[(filtered_df['country'] == selected_country) & (filtered_df['city'] == selected_city)]
-        
-        # Reset index to remove it from display
-        table_data = table_data.reset_index(drop=True)
-        
+        table_columns = ['author_name', 'affiliation', 'title', 'publication_date']
+        if location_mode == "Distance":
+            st.caption(f"{len(table_data):,} publications within {location_label}, nearest first")
+            table_columns = table_columns + ['city', 'distance_km']
+
         # Style the dataframe
-        styled_table = table_data[['author_name', 'affiliation', 'title', 'publication_date']].style.apply(
+        styled_table = table_data[table_columns].style.apply(
             lambda x: ['background-color: #f0f2f6' if i % 2 == 0 else '' for i in range(len(x))],
             axis=0
         ).highlight_max(
@@ -412,8 +733,21 @@ elif page == "Geographic Analysis":
             use_container_width=True,
             hide_index=True
         )
-        
-        
+
+    if location_mode == "Distance":
+        # Nearest institutions to the center, over all years (k-nearest query on the institution tree)
+        st.markdown("## 🏛️ Nearest Institutions")
+
+        @stages.stage('nearest_institutions', inputs=['dataset', 'geo_selection'])
+        def nearest_institutions(df, geo_selection):
+            nearest = spatial_index.nearest_institutions(geo_selection['latitude'], geo_selection['longitude'], k=10)
+            nearest = nearest[['institution', 'city', 'country', 'publications', 'distance_km']]
+            nearest.columns = ['Institution', 'City', 'Country', 'Publications (all years)', 'Distance (km)']
+            return nearest.round({'Distance (km)': 1})
+
+        st.dataframe(stages['nearest_institutions'], use_container_width=True, hide_index=True)
+
+
 elif page == "Author and Affiliation Insights":
     st.header("Author and Affiliation Insights")
 
@@ -421,112 +755,222 @@ elif page == "Author and Affiliation Insights":
     st.markdown("## 🏆 Top 10 Authors by Publications")
 
     # Calculate top authors by number of publications
-    top_authors = filtered_df['author_name'].value_counts().head(10).reset_index()
-    top_authors.columns = ['Author', 'Number of Publications']
-
-    # Bar chart for top authors
-    fig_authors = px.bar(
-        top_authors,
-        x='Author',
-        y='Number of Publications',
-        title="Top 10 Authors by Publications",
-        color='Number of Publications',
-        color_continuous_scale='Blues',
-        labels={'Number of Publications': 'Publications'}
-    )
+    @stages.stage('top_authors', inputs=['year_filter', 'selection'])
+    def top_authors(year_filter, selection):
+        top_authors = result_cache.get_or_compute(
+            'aggregate', {'by': 'author_name', 'top': 10, **selection},
+            lambda: year_filter[2]['author_name'].value_counts().head(10).reset_index()
+        )
+        top_authors.columns = ['Author', 'Number of Publications']
+        return top_authors
+
+    @stages.stage('authors_figure', inputs=['top_authors'])
+    def authors_figure(top_authors):
+        # Bar chart for top authors
+        fig_authors = px.bar(
+            top_authors,
+            x='Author',
+            y='Number of Publications',
+            title="Top 10 Authors by Publications",
+            color='Number of Publications',
+            color_continuous_scale='Blues',
+            labels={'Number of Publications': 'Publications'}
+        )
 
-    # Customize chart layout
-    fig_authors.update_layout(
-        title={
-            "text": "",
-            "y": 0.95,
-            "x": 0.5,
-            "xanchor": "center",
-            "yanchor": "top",
-            "font": {"size": 20, "color": "#34495e"}  # Title font
-        },
-        xaxis=dict(
-            title='Author',
-            titlefont=dict(size=14, color="#2c3e50"),
-            tickfont=dict(size=12, color="#34495e"),
-            gridcolor="rgba(200,200,200,0.2)",  # Light gridlines
-            zeroline=False
-        ),
-        yaxis=dict(
-            title='Number of Publications',
-            titlefont=dict(size=14, color="#2c3e50"),
-            tickfont=dict(size=12, color="#34495e"),
-            gridcolor="rgba(200,200,200,0.3)",  # Slightly darker gridlines
-            zeroline=False
-        ),
-        plot_bgcolor="#f4f4f4",  # Background color to match app background
-        paper_bgcolor="#f4f4f4",  # Full chart background color
-        font=dict(family="Arial", size=12, color="#2c3e50"),
-        margin=dict(t=20, b=40)  # Adjust margins
-    )
+        # Customize chart layout
+        fig_authors.update_layout(
+            title={
+                "text": "",
+                "y": 0.95,
+                "x": 0.5,
+                "xanchor": "center",
+                "yanchor": "top",
+                "font": {"size": 20, "color": "#34495e"}  # Title font
+            },
+            xaxis=dict(
+                title='Author',
+                titlefont=dict(size=14, color="#2c3e50"),
+                tickfont=dict(size=12, color="#34495e"),
+                gridcolor="rgba(200,200,200,0.2)",  # Light gridlines
+                zeroline=False
+            ),
+            yaxis=dict(
+                title='Number of Publications',
+                titlefont=dict(size=14, color="#2c3e50"),
+                tickfont=dict(size=12, color="#34495e"),
+                gridcolor="rgba(200,200,200,0.3)",  # Slightly darker gridlines
+                zeroline=False
+            ),
+            plot_bgcolor="#f4f4f4",  # Background color to match app background
+            paper_bgcolor="#f4f4f4",  # Full chart background color
+            font=dict(family="Arial", size=12, color="#2c3e50"),
+            margin=dict(t=20, b=40)  # Adjust margins
+        )
+        return fig_authors
+
+    fig_authors = stages['authors_figure']
     st.plotly_chart(fig_authors, use_container_width=True)
 
     # --- Affiliation Analysis ---
     st.markdown("## 🏫 Top 10 Affiliations by Publications")
 
     # Calculate top affiliations by number of publications
-    top_affiliations = filtered_df['affiliation'].value_counts().head(10).reset_index()
-    top_affiliations.columns = ['Affiliation', 'Number of Publications']
-
-    # Pie chart for top affiliations
-    fig_affiliations = px.pie(
-        top_affiliations,
-        names='Affiliation',
-        values='Number of Publications',
-        title="Top 10 Affiliations by Publications",
-        color_discrete_sequence=px.colors.sequential.RdBu
-    )
+    @stages.stage('top_affiliations', inputs=['year_filter', 'selection'])
+    def top_affiliations(year_filter, selection):
+        top_affiliations = result_cache.get_or_compute(
+            'aggregate', {'by': 'affiliation', 'top': 10, **selection},
+            lambda: year_filter[2]['affiliation'].value_counts().head(10).reset_index()
+        )
+        top_affiliations.columns = ['Affiliation', 'Number of Publications']
+        return top_affiliations
+
+    @stages.stage('affiliations_figure', inputs=['top_affiliations'])
+    def affiliations_figure(top_affiliations):
+        # Pie chart for top affiliations
+        fig_affiliations = px.pie(
+            top_affiliations,
+            names='Affiliation',
+            values='Number of Publications',
+            title="Top 10 Affiliations by Publications",
+            color_discrete_sequence=px.colors.sequential.RdBu
+        )
 
-    # Customize the layout for Affiliation Pie chart
-    fig_affiliations.update_layout(
-        title={
-            "text": "",
-            "y": 0.95,
-            "x": 0.5,
-            "xanchor": "center",
-            "yanchor": "top",
-            "font": {"size": 20, "color": "#34495e"}  # Title font
-        },
-        plot_bgcolor="#f4f4f4",  # Background color to match app background
-        paper_bgcolor="#f4f4f4",  # Full chart background color
-        font=dict(family="Arial", size=12, color="#2c3e50"),
-        margin=dict(t=20, b=40)  # Adjust margins
-    )
+        # Customize the layout for Affiliation Pie chart
+        fig_affiliations.update_layout(
+            title={
+                "text": "",
+                "y": 0.95,
+                "x": 0.5,
+                "xanchor": "center",
+                "yanchor": "top",
+                "font": {"size": 20, "color": "#34495e"}  # Title font
+            },
+            plot_bgcolor="#f4f4f4",  # Background color to match app background
+            paper_bgcolor="#f4f4f4",  # Full chart background color
+            font=dict(family="Arial", size=12, color="#2c3e50"),
+            margin=dict(t=20, b=40)  # Adjust margins
+        )
+        return fig_affiliations
+
+    fig_affiliations = stages['affiliations_figure']
     st.plotly_chart(fig_affiliations, use_container_width=True)
 
+    # --- Collaboration Network ---
+    st.markdown("## 🤝 Collaboration Network")
+
+    network_type = stages.set_input('network_type', st.radio("Collaboration between", ["Authors", "Affiliations"], horizontal=True))
+
+    @stages.stage('collaboration_graph', inputs=['year_filter', 'selection', 'network_type'])
+    def collaboration_graph(year_filter, selection, network_type):
+        if 'year' in selection:
+            return collaboration_graphs[network_type].get(selection['year'])
+        # Arbitrary date ranges are not precomputed; the graph of the selected rows is still sparse and cheap
+        return build_collaboration_graph(year_filter[2], 'author_name' if network_type == "Authors" else 'affiliation')
+
+    graph = stages['collaboration_graph']
+
+    if graph is None or graph.n_edges == 0:
+        st.info(f"No collaborations between {network_type.lower()} recorded in {selection_label}.")
+    else:
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric(f"Collaborating {network_type}", int((graph.degree > 0).sum()))
+        with col2:
+            st.metric("Collaboration Links", graph.n_edges)
+        with col3:
+            st.metric("Largest Network", int(graph.component_size.max()))
+
+        # Top collaborators (precomputed degree and weighted collaboration counts)
+        top_nodes = graph.top_nodes(25)
+        st.dataframe(top_nodes.head(10), use_container_width=True, hide_index=True)
+
+        # Network of the most collaborative nodes on a circular layout
+        edges = graph.subgraph_edges(top_nodes['Name'])
+        angles = np.linspace(0, 2 * np.pi, len(top_nodes), endpoint=False)
+        positions = dict(zip(top_nodes['Name'], zip(np.cos(angles), np.sin(angles))))
+
+        edge_x, edge_y = [], []
+        for source, target in zip(edges['source'], edges['target']):
+            edge_x += [positions[source][0], positions[target][0], None]
+            edge_y += [positions[source][1], positions[target][1], None]
+
+        fig_network = go.Figure(data=[
+            go.Scatter(
+                x=edge_x, y=edge_y,
+                mode='lines',
+                line=dict(width=1, color="rgba(52,73,94,0.4)"),
+                hoverinfo='skip'
+            ),
+            go.Scatter(
+                x=np.cos(angles), y=np.sin(angles),
+                mode='markers',
+                text=top_nodes['Name'],
+                customdata=top_nodes[['Collaborators', 'Collaborations']],
+                marker=dict(
+                    size=10 + 2 * top_nodes['Collaborators'].clip(upper=15),
+                    color=top_nodes['Collaborations'],
+                    colorscale='Blues',
+                    line=dict(width=1, color="#2c3e50")
+                ),
+                hovertemplate='<b>%{text}</b><br>Collaborators: %{customdata[0]}<br>Shared Papers: %{customdata[1]}<extra></extra>'
+            )
+        ])
+        fig_network.update_layout(
+            showlegend=False,
+            xaxis=dict(visible=False),
+            yaxis=dict(visible=False, scaleanchor='x'),
+            plot_bgcolor="#f4f4f4",
+            paper_bgcolor="#f4f4f4",
+            font=dict(family="Arial", size=12, color="#2c3e50"),
+            margin=dict(t=20, b=20)
+        )
+        st.plotly_chart(fig_network, use_container_width=True)
+
+        # Collaborators of a single author/affiliation
+        selected_node = st.selectbox(
+            f"Show collaborators of {network_type[:-1].lower()}",
+            options=sorted(graph.labels[graph.degree > 0])
+        )
+        st.dataframe(graph.top_collaborators(selected_node), use_container_width=True, hide_index=True)
+
     # --- Raw Data for Selected Year ---
     st.markdown("### Raw Data for Selected Year")
     
     # Dropdown or text input for author name filter
-    author_list = filtered_df['author_name'].dropna().unique()
-    selected_author = st.selectbox("Filter by Author", options=["All"] + sorted(author_list), index=0)
-    
-    # Filter the data based on selected author
-    if selected_author == "All":
-        filtered_raw_data = filtered_df
-    else:
-        filtered_raw_data = filtered_df[filtered_df['author_name'] == selected_author]
-
-    # Reset index to remove it from display
-    filtered_raw_data = filtered_raw_data.reset_index(drop=True)
-
-    # Style the dataframe
-    styled_table = filtered_raw_data[['author_name', 'affiliation', 'title', 'publication_date']].style.apply(
-        lambda x: ['background-color: #f0f2f6' if i % 2 == 0 else '' for i in range(len(x))],
-        axis=0
-    ).highlight_max(
-        subset=['publication_date'], 
-        color='#e6f2ff'
-    ).set_properties(**{
-        'font-size': '12px',
-        'border': '1px solid #ddd',
-        'text-align': 'left'
-    })
+    @stages.stage('author_options', inputs=['year_filter'])
+    def author_options(year_filter):
+        return ["All"] + sorted(year_filter[2]['author_name'].dropna().unique())
+
+    selected_author = st.selectbox("Filter by Author", options=stages['author_options'], index=0)
+    stages.set_input('selected_author', selected_author)
+
+    @stages.stage('author_table', inputs=['year_filter', 'selected_author'])
+    def author_table(year_filter, selected_author):
+        filtered_df = year_filter[2]
+        # Filter the data based on selected author
+        if selected_author == "All":
+            filtered_raw_data = filtered_df
+        else:
+            filtered_raw_data = filtered_df[filtered_df['author_name'] == selected_author]
+
+        # Reset index to remove it from display
+        filtered_raw_data = filtered_raw_data.reset_index(drop=True)
+
+        # Style the dataframe
+        styled_table = filtered_raw_data[['author_name', 'affiliation', 'title', 'publication_date']].style.apply(
+            lambda x: ['background-color: #f0f2f6' if i % 2 == 0 else '' for i in range(len(x))],
+            axis=0
+        ).highlight_max(
+            subset=['publication_date'], 
+            color='#e6f2ff'
+        ).set_properties(**{
+            'font-size': '12px',
+            'border': '1px solid #ddd',
+            'text-align': 'left'
+        })
+        return styled_table
+
+    styled_table = stages['author_table']
 
     # Display the styled dataframe
     st.dataframe(
@@ -578,27 +1022,41 @@ elif page == "Topic/Keyword Filter":
                     help="Select the range of publication years to filter"
                 )
 
+        # Literal, case-insensitive keyword matches within the selected range (same rule as query_server)
+        if keyword:
+            keyword_rows = result_cache.get_or_compute(
+                'search', {'keyword': keyword, **selection},
+                lambda: pd.DataFrame({'row': selection_rows[
+                    (filtered_df['title'].str.contains(keyword, case=False, na=False, regex=False) |
+                     filtered_df['affiliation'].str.contains(keyword, case=False, na=False, regex=False) |
+                     filtered_df['city'].str.contains(keyword, case=False, na=False, regex=False)).to_numpy()
+                ]})
+            )['row'].to_numpy()
+            keyword_mask = np.zeros(bitmap_index.n_rows, dtype=bool)
+            keyword_mask[keyword_rows] = True
+            keyword_bits = bitmap_index.intersect(selection_bits, bitmap_index.from_mask(keyword_mask))
+        else:
+            keyword_bits = selection_bits
+        range_bits = bitmap_index.mask('year', range(selected_years[0], selected_years[1] + 1))
+        facet_bits = bitmap_index.intersect(keyword_bits, range_bits)
+
         with col3:
-            # Country Multiselect
+            # Country Multiselect with live paper counts under the current keyword and year filters
             countries = st.multiselect(
                 "Filter by Countries",
                 options=sorted(filtered_df['country'].unique().tolist()),
                 default=None
             )
+            # Counts stay out of the option labels: changing labels would reset the widget's selection
+            country_counts = bitmap_index.facet_counts('country', facet_bits)
+            shown_counts = country_counts[country_counts.index.isin(countries)] if countries else country_counts.head(8)
+            st.caption(" · ".join(f"{country}: {count}" for country, count in shown_counts.items()) or "No matching papers")
         st.markdown("</div>", unsafe_allow_html=True)
 
-        # Filter Logic
+        # Filter Logic (bitwise AND of keyword, year range and country bitsets)
         if keyword or countries:
-            filtered_df['publication_date'] = pd.to_datetime(filtered_df['publication_date'], errors='coerce')
-            filtered_data = filtered_df[
-                (filtered_df['title'].str.contains(keyword, case=False, na=False) |
-                 filtered_df['affiliation'].str.contains(keyword, case=False, na=False) |
-                 filtered_df['city'].str.contains(keyword, case=False, na=False)) &
-                (filtered_df['publication_date'].dt.year >= selected_years[0]) &
-                (filtered_df['publication_date'].dt.year <= selected_years[1])
-            ]
-            if countries:
-                filtered_data = filtered_data[filtered_data['country'].isin(countries)]
+            country_bits = bitmap_index.mask('country', countries) if countries else bitmap_index.all()
+            filtered_data = df.iloc[bitmap_index.rows(bitmap_index.intersect(facet_bits, country_bits))]
 
             if filtered_data.empty:
                 st.warning(f"No research papers found for '{keyword}'")
@@ -645,37 +1103,65 @@ elif page == "Topic/Keyword Filter":
                 with tab2:  # 🗺️ Geospatial View Tab
                     st.markdown("### 🗺️ Geospatial Analysis")
 
-                    # Geospatial Visualization
-                    country_counts = filtered_data['country'].value_counts().reset_index()
-                    country_counts.columns = ['country', 'publication_count']
+                    # Geospatial Visualization (ISO-3 codes resolved at ingest, local GeoJSON outlines)
+                    country_counts = country_codes.country_counts(filtered_data)
 
-                    if not filtered_data.empty:
+                    if not country_counts.empty:
                         fig = px.choropleth(
-                            country_counts, 
-                            locations='country',
-                            locationmode='country names',
+                            country_counts,
+                            geojson=country_codes.load_geojson(),
+                            locations='iso3',
+                            featureidkey='id',
                             color='publication_count',
                             hover_name='country',
                             color_continuous_scale='Viridis',
                             title='Geospatial Analysis'
                         )
+                        # Countries too small for the bundled outlines are shown as markers instead
+                        small_countries = country_counts[~country_counts['iso3'].isin(country_codes.outline_codes())]
+                        if not small_countries.empty:
+                            fig.add_trace(go.Scattergeo(
+                                lat=small_countries['latitude'],
+                                lon=small_countries['longitude'],
+                                text=small_countries['country'],
+                                customdata=small_countries['publication_count'],
+                                mode='markers',
+                                marker=dict(size=8, color="#34495e"),
+                                hovertemplate='<b>%{text}</b><br>publication_count=%{customdata}<extra></extra>',
+                                showlegend=False
+                            ))
+                        fig.update_geos(
+                            visible=False,
+                            showcountries=False,
+                            projection_type='natural earth',
+                            lataxis_range=[-60, 90]
+                        )
                         fig.update_layout(
                             height=600,
                             plot_bgcolor="#f4f4f4", 
                             paper_bgcolor="#f4f4f4"
                         )
                         st.plotly_chart(fig, use_container_width=True)
+
+                        unresolved = country_codes.unresolved_countries(filtered_data)
+                        if not unresolved.empty:
+                            st.caption(f"Not shown on the map (unrecognised country names): {', '.join(unresolved.index)}")
                     else:
                         st.info("No geospatial data available.")
 
                 # Publication Trends
                 with tab3:
-                    keyword_filtered_df = df[
-                        (df['title'].str.contains(keyword, case=False, na=False) |
-                         df['affiliation'].str.contains(keyword, case=False, na=False) |
-                         df['city'].str.contains(keyword, case=False, na=False))
-                    ]
-                    yearly_trends = keyword_filtered_df.groupby(keyword_filtered_df['publication_date'].dt.year).size()
+                    def keyword_trends():
+                        keyword_filtered_df = df[
+                            (df['title'].str.contains(keyword, case=False, na=False, regex=False) |
+                             df['affiliation'].str.contains(keyword, case=False, na=False, regex=False) |
+                             df['city'].str.contains(keyword, case=False, na=False, regex=False))
+                        ]
+                        return keyword_filtered_df.groupby(keyword_filtered_df['publication_date'].dt.year).size().to_frame('count')
+
+                    yearly_trends = result_cache.get_or_compute(
+                        'aggregate', {'by': 'year', 'keyword': keyword}, keyword_trends
+                    )['count']
                     if not yearly_trends.empty:
                         trend_fig = go.Figure(data=[
                             go.Bar(
@@ -705,6 +1191,39 @@ elif page == "Topic/Keyword Filter":
                     cluster = model.predict([keyword])  # Predict cluster based on the keyword
                     st.write(f"## Predicted Cluster: {cluster[0]}")  # Show the predicted cluster
 
+                    # Cluster Profile (precomputed top terms, year distribution and country mix)
+                    profiles = load_cluster_profiles(profiles_version())
+                    if profiles is None:
+                        st.info("Cluster profiles have not been built yet. Run `python cluster_profiles.py build`.")
+                    elif cluster[0] not in profiles.clusters:
+                        st.info(f"No profile available for Cluster {cluster[0]}")
+                    else:
+                        st.markdown("### 🧬 Cluster Profile")
+                        st.metric("Papers in Cluster", profiles.size(cluster[0]))
+                        col1, col2, col3 = st.columns(3)
+                        with col1:
+                            top_terms = profiles.top_terms(cluster[0], 10, distinctive=True)
+                            terms_fig = px.bar(
+                                top_terms.iloc[::-1], x='Weight', y='Term', orientation='h',
+                                title="Distinctive Terms", color_discrete_sequence=["#667eea"]
+                            )
+                            terms_fig.update_layout(plot_bgcolor="#f4f4f4", paper_bgcolor="#f4f4f4", margin=dict(t=40, b=40))
+                            st.plotly_chart(terms_fig, use_container_width=True)
+                        with col2:
+                            years_fig = px.bar(
+                                profiles.year_histogram(cluster[0]), x='Year', y='Papers',
+                                title="Papers per Year", color_discrete_sequence=["#667eea"]
+                            )
+                            years_fig.update_layout(plot_bgcolor="#f4f4f4", paper_bgcolor="#f4f4f4", margin=dict(t=40, b=40))
+                            st.plotly_chart(years_fig, use_container_width=True)
+                        with col3:
+                            countries_fig = px.pie(
+                                profiles.country_mix(cluster[0]), names='Country', values='Papers',
+                                title="Country Mix", color_discrete_sequence=px.colors.sequential.RdBu
+                            )
+                            countries_fig.update_layout(plot_bgcolor="#f4f4f4", paper_bgcolor="#f4f4f4", margin=dict(t=40, b=40))
+                            st.plotly_chart(countries_fig, use_container_width=True)
+
                     # Load the dataset containing cluster data
                     cluster_data = pd.read_csv('data_with_cluster.csv')
 
@@ -782,4 +1301,9 @@ elif page == "Topic/Keyword Filter":
                             f"{filtered_data['publication_date'].dt.year.min()} - {filtered_data['publication_date'].dt.year.max()}"
                         )
     
-    topic_keyword_filter(filtered_df, df)
\ No newline at end of file
+    topic_keyword_filter(filtered_df, df)
+
+# Which stages this rerun recomputed and which it reused from the previous runs
+with st.sidebar.expander("⚙️ Stage Trace"):
+    st.caption(f"Rerun {stages.run_number}: {len(stages.recomputed())} of {len(stages.trace)} stages recomputed")
+    st.dataframe(pd.DataFrame(stages.trace), use_container_width=True, hide_index=True)